@@ -22,8 +22,30 @@ import tagset
 # modules
 import mm
 import trie
+import datrie
+import aho
+import dawg
+import lattice
+import session
+import mp
+import batch
+import cache
+import stream
 import unigram
-import crf
+# hmm and crftext need NumPy, crf needs the CRF++ binding, which are
+# optional
+try:
+    import hmm
+except ImportError:
+    hmm = None
+try:
+    import crf
+except ImportError:
+    crf = None
+try:
+    import crftext
+except ImportError:
+    crftext = None
 import brill
 
 if __name__ == "__main__":
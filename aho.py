@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Aho-Corasick automaton for finding all dictionary words in a text
+"""
+__all__ = ["AhoCorasick"]
+
+from trie import Trie
+
+class AhoCorasick(object):
+    """An Aho-Corasick automaton, finds every occurrence of every key of
+    a trie in a single pass over the text.
+
+    The automaton is a copy of the trie, with a state for each node,
+    plus a failure link for each state, which points to the state of
+    the longest proper suffix of the state's key that is also a prefix
+    in the trie, and an output link, which points to the nearest state
+    along the failure links holding a key. For details, see
+    http://en.wikipedia.org/wiki/Aho-Corasick
+
+    The trie's nodes are left alone, since tries share them with their
+    snapshots and may change later, so the automaton takes about as
+    much memory as the trie again, e.g. 230MB for the 349,046 words of
+    the jieba lexicon. The trie itself is not kept.
+    """
+
+    def __init__(self, keys=None, value=lambda x:0, trie=None):
+        """Construct an Aho-Corasick automaton from keys, or from an
+        existing trie.
+
+        @type keys: iterable of random accessible objects with
+        hashable elements
+        @param keys: keys from which the automaton is constructed
+        @type value: callable
+        @param value: method to get values from keys, default sets
+        everything to 0
+        @type trie: Trie
+        @param trie: the trie to build the automaton on, if provided,
+        keys and value are ignored
+        """
+        if trie is None:
+            trie = Trie(keys, value)
+        root = trie._trie_root
+        # state 0 is the root, the empty key never matches
+        goto = [{}]
+        fail = [0]
+        out = [0]
+        depth = [0]
+        values = [None]
+        # breadth first, so that failure links always point to states
+        # whose transitions are complete
+        queue = [(root, 0)]
+        for node, state in queue:
+            for label, child in node._child.iteritems():
+                new = len(goto)
+                goto[state][label] = new
+                if state == 0:
+                    f = 0
+                else:
+                    f = fail[state]
+                    while f and label not in goto[f]:
+                        f = fail[f]
+                    f = goto[f].get(label, 0)
+                goto.append({})
+                fail.append(f)
+                out.append(f if values[f] is not None else out[f])
+                depth.append(depth[state] + 1)
+                values.append(child._value)
+                queue.append((child, new))
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._depth = depth
+        self._values = values
+
+    def finditer(self, seq, offset=0):
+        """Find all the keys occurring in seq.
+
+        seq is consumed element by element and is never indexed, so
+        any iterable works, e.g. itertools.chain(*chunks) streams over
+        a long text read chunk by chunk.
+
+        @type seq: iterable of hashable elements
+        @param seq: the text to be scanned
+        @type offset: integer
+        @param offset: index of the first element of seq, added to all
+        the reported indices
+
+        @return: a generator iterates over (start, end, value) tuples,
+        ordered by end, longer keys first for the same end
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        depth = self._depth
+        values = self._values
+        state = 0
+        end = offset
+        for element in seq:
+            end += 1
+            while True:
+                nxt = goto[state].get(element)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            match = state if values[state] is not None else out[state]
+            while match:
+                yield (end - depth[match], end, values[match])
+                match = out[match]
+
+    def findall(self, seq, offset=0):
+        """Find all the keys occurring in seq.
+
+        @return: a list of (start, end, value) tuples, see finditer()
+        """
+        return list(self.finditer(seq, offset))
+
+    def __repr__(self):
+        return "<AhoCorasick: 0x%08x>" % id(self)
+
+
+def demo():
+    """Demo for AhoCorasick
+    """
+    from itertools import chain
+
+    words = [u"结合", u"合成", u"成分", u"分子", u"子时", u"结合成"]
+    ac = AhoCorasick(words, value=len)
+    sent = u"结合成分子时"
+    print " ".join(words)
+    print sent
+    for start, end, value in ac.finditer(sent):
+        print start, end, sent[start:end], value
+
+    print "Streaming over chunks"
+    chunks = [u"结合", u"成分子", u"时"]
+    print " ".join([sent[start:end]
+                    for start, end, value in ac.finditer(chain(*chunks))])
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Segment many sentences with a pool of worker processes
+"""
+__all__ = ["seg_many", "seg_document"]
+
+import time
+from multiprocessing import Pool, cpu_count
+
+# the segmentor of a worker process, set once when the worker starts
+_segmentor = None
+
+def _init_worker(segmentor):
+    global _segmentor
+    _segmentor = segmentor
+
+def _seg(sent):
+    return _segmentor.seg(sent)
+
+def seg_many(segmentor, sentences, workers=None, chunksize=256,
+             verbose=False):
+    """Segment sentences in worker processes.
+
+    The segmentor is handed to each worker once when the pool starts.
+    Workers are forked, so it is inherited rather than pickled, and
+    even segmentors holding a CRF++ tagger work. Sentences are sent to
+    the workers chunksize at a time.
+
+    @type segmentor: any object with a seg(sent) method, e.g. FMMSeg,
+    BMMSeg, TagSeg or CRFTagger
+    @param segmentor: the segmentor to be used
+    @type sentences: iterable of unicode strings
+    @param sentences: the sentences to be segmented
+    @type workers: positive integer
+    @param workers: number of worker processes, default to the number
+    of CPUs, if it is 1, sentences are segmented in this process
+    @type chunksize: positive integer
+    @param chunksize: how many sentences are sent to a worker at a time
+    @type verbose: bool
+    @param verbose: whether to print the throughput when done
+
+    @return: a generator iterates over the lists of segmented words,
+    in the same order as sentences
+    """
+    if workers is None:
+        workers = cpu_count()
+    start = time.time()
+    count = 0
+    chars = 0
+    if workers == 1:
+        for sent in sentences:
+            words = segmentor.seg(sent)
+            count += 1
+            chars += len(sent)
+            yield words
+    else:
+        pool = Pool(workers, _init_worker, (segmentor,))
+        try:
+            for words in pool.imap(_seg, sentences, chunksize):
+                count += 1
+                chars += sum(len(i) for i in words)
+                yield words
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    if verbose:
+        elapsed = max(time.time() - start, 1e-6)
+        print "%d sentences, %d characters in %.2fs" % (count, chars,
+                                                       elapsed),
+        print "(%.0f sentences/s, %.0f characters/s, %d workers)" % \
+              (count / elapsed, chars / elapsed, workers)
+
+def _safe_cut(segmentor, text, pos, longest):
+    """Find the first position from pos on that no word spans, where
+    every dictionary based segmentor has to cut.
+
+    @param longest: the length of the longest word
+    @return: the position, or len(text) if there is none
+    """
+    context = longest
+    size = len(text)
+    while pos < size:
+        start = max(pos - context + 1, 0)
+        window = text[start:pos + context]
+        lattice = segmentor.lattice(window)
+        # a word spanning pos must start before it
+        for offset in xrange(pos - start):
+            end = lattice.longest_prefix(window, offset)
+            if end is not None and end + start > pos:
+                break
+        else:
+            return pos
+        pos += 1
+    return size
+
+def seg_document(segmentor, text, workers=None, chunk_size=100000,
+                 verbose=False):
+    """Segment one long text in worker processes.
+
+    The text is cut into chunks of about chunk_size characters at
+    positions no dictionary word spans. Any segmentation by the
+    dictionary cuts there too, so segmenting the chunks separately
+    gives the same words as segmenting the whole text, for segmentors
+    which decide each word by the dictionary alone, like FMMSeg and
+    BMMSeg. Other segmentors are rejected: BiMMSeg chooses between two
+    segmentations of the whole text, and MPSeg compares sums of log
+    probabilities, whose rounding depends on where the text ends, so
+    equally probable paths may be chosen differently in a chunk.
+
+    @type segmentor: FMMSeg or BMMSeg
+    @param segmentor: the segmentor to be used, whose context, i.e.
+    the length of its longest word, must be known
+    @type text: unicode string
+    @param text: the text to be segmented
+    @type workers: positive integer
+    @param workers: number of worker processes, see seg_many()
+    @type chunk_size: positive integer
+    @param chunk_size: how many characters are segmented at a time
+    @type verbose: bool
+    @param verbose: whether to print the throughput when done
+
+    @return: a list of segmented words
+    @raise ValueError: if the segmentor can not segment a text in
+    chunks
+    """
+    longest = getattr(segmentor, "context", None)
+    if longest is None:
+        raise ValueError("%r can not segment a text in chunks" %
+                         segmentor)
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = _safe_cut(segmentor, text, start + chunk_size, longest)
+        chunks.append(text[start:end])
+        start = end
+    words = []
+    for res in seg_many(segmentor, chunks, workers, 1, verbose):
+        words.extend(res)
+    return words
+
+
+def demo():
+    """Demo for seg_many
+    """
+    from mm import FMMSeg
+
+    words = [u"结合", u"合成", u"分子", u"子时", u"马勒戈壁", u"草泥马",
+             u"河蟹", u"战胜"]
+    seg = FMMSeg(train=words)
+    sents = [u"结合成分子时", u"马勒戈壁上的草泥马战胜了河蟹。"] * 1000
+    res = list(seg_many(seg, sents, workers=2, chunksize=100,
+                        verbose=True))
+    print "/".join(res[0])
+    print "/".join(res[-1])
+
+    print "One long document"
+    text = u"".join(sents)
+    res = seg_document(seg, text, workers=2, chunk_size=1000,
+                       verbose=True)
+    print res == seg.seg(text)
+
+    print "Random documents"
+    import random
+    from mm import BMMSeg, BiMMSeg
+    from mp import MPSeg
+    chars = u"".join(set(u"".join(words)))
+    for seg in [FMMSeg(train=words), BMMSeg(train=words),
+                BiMMSeg(train=words), MPSeg(words)]:
+        same = 0
+        try:
+            for i in xrange(100):
+                text = u"".join([random.choice(chars)
+                                 for j in xrange(500)])
+                same += seg_document(seg, text, workers=1,
+                                     chunk_size=50) == seg.seg(text)
+        except ValueError:
+            print seg.__class__.__name__, "rejected"
+        else:
+            print seg.__class__.__name__, "%d of 100 the same" % same
+
+
+if __name__ == "__main__":
+    demo()
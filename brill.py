@@ -14,6 +14,7 @@ Brill tagger
 """
 __all__ = ["BrillRuleTemplate", "BrillRule", "BrillTagger", "AtomicPredicate"]
 
+from array import array
 from collections import defaultdict
 from pprint import pprint
 
@@ -275,6 +276,7 @@ class BrillTagger(object):
         self.tagset = tagset
         self.itag = initial_tagger
         self.rules = rules
+        self.generation = 0
         self.trace = trace
         if trace:
             my_print("__init__:")
@@ -317,10 +319,12 @@ class BrillTagger(object):
             my_print("\tfinal:", res)
         return res
 
-    def train(self, train, rule_templates, max_rules, min_score, verbose=False):
+    def train(self, train, rule_templates, max_rules, min_score, verbose=False,
+              weighted=False):
         """Train with given rule templates
 
-        @type train: list of words
+        @type train: list of words, or of (sentence, count) tuples if
+        weighted
         @param train: the training corpus
 
         @type rule_templates: a list of BrillRuleTemplate
@@ -334,6 +338,12 @@ class BrillTagger(object):
 
         @type verbose: bool
         @param verbose: whether to give verbose output during training
+
+        @type weighted: bool
+        @param weighted: whether train is weighted sentences, e.g. from
+        BaseCorpusReader.weighted_sents(), each of them is tagged once,
+        and every fix or mistake in it scores count. Contexts across
+        the end of a sentence see the next distinct sentence then.
         """
         # `declaration', these are to be used in helper functions
         trace = self.trace
@@ -343,7 +353,18 @@ class BrillTagger(object):
         tag_to_index = defaultdict(set)
         error_idx = defaultdict(set)
         correct_idx = defaultdict(set)
-        train = [i for i in self.tagset.tag(train)]
+        if weighted:
+            # the weight of each character is the count of its sentence
+            words = []
+            weight = array("i")
+            for sent, count in train:
+                words.extend(sent)
+                weight.extend(array("i", [count]) *
+                              sum([len(i) for i in sent]))
+            train = [i for i in self.tagset.tag(words)]
+        else:
+            train = [i for i in self.tagset.tag(train)]
+            weight = array("i", [1]) * len(train)
         rules_set = set()
 
         if verbose:
@@ -370,7 +391,7 @@ class BrillTagger(object):
                 for i in self.changes:
                     if train[i][1] == rule.to_tag:
                         # we are right
-                        self.score += 1
+                        self.score += weight[i]
                     else:
                         # we are wrong but it does not hurt. at least
                         # we are not bringing new errors.
@@ -485,7 +506,7 @@ class BrillTagger(object):
                             if trace:
                                 my_print("\tmade a mistake @", idx)
                             helper.changes.append(idx)
-                            helper.score -= 1
+                            helper.score -= weight[idx]
                             score_to_rules[helper.score].add(rule)
                             break
                     except StopIteration:
@@ -582,6 +603,7 @@ class BrillTagger(object):
             print "Training complete"
             print "New rule size: %d\n" % len(rules)
         self.rules = rules
+        self.generation += 1
 
 
 
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Cache of segmentation results for repetitive text
+"""
+__all__ = ["CachedSeg"]
+
+import sys
+from array import array
+from collections import OrderedDict
+from threading import Lock
+
+class CachedSeg(object):
+    """A least recently used cache in front of a segmentor. Results of
+    seg() and seg_spans() are remembered by sentence, and the least
+    recently used ones are evicted when there are more than max_size
+    of them, or when they take more than max_bytes of memory.
+
+    If the segmentor has a generation attribute, the cache is cleared
+    as soon as it changes. Segmentors and taggers which can be updated,
+    like FMMSeg, MPSeg and UnigramTagger, start it at 0 and bump it in
+    every method which changes their dictionary or model, and TagSeg
+    reports the generation of its tagger. Segmentors without one are
+    assumed never to change.
+
+    A CachedSeg can be shared by many threads.
+    """
+
+    def __init__(self, segmentor, max_size=10000, max_bytes=None):
+        """Construct a cache in front of a segmentor.
+
+        @type segmentor: any object with a seg(sent) method
+        @param segmentor: the segmentor whose results are cached
+        @type max_size: positive integer or None
+        @param max_size: how many results can be cached, None for no
+        limit
+        @type max_bytes: positive integer or None
+        @param max_bytes: how much memory in bytes the cached results
+        can take, roughly, None for no limit
+        """
+        self._segmentor = segmentor
+        self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._generation = self._current()
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self):
+        return getattr(self._segmentor, "generation", 0)
+
+    def _get(self, key):
+        """Look up a key, marking it most recently used.
+
+        @return: (generation, result), the result is None if missing
+        """
+        generation = self._current()
+        self._lock.acquire()
+        try:
+            if generation != self._generation:
+                self._clear()
+                self._generation = generation
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return generation, None
+            self._cache[key] = entry
+            self.hits += 1
+            return generation, entry[0]
+        finally:
+            self._lock.release()
+
+    def _put(self, key, generation, result):
+        """Cache a result, unless the dictionary has changed since it
+        was looked up.
+        """
+        size = sys.getsizeof(key[1]) + sys.getsizeof(result)
+        if not isinstance(result, array):
+            size += sum(sys.getsizeof(i) for i in result)
+        self._lock.acquire()
+        try:
+            if generation != self._generation or key in self._cache:
+                return
+            self._cache[key] = (result, size)
+            self._bytes += size
+            cache = self._cache
+            while cache and (
+                    (self._max_size is not None and
+                     len(cache) > self._max_size) or
+                    (self._max_bytes is not None and
+                     self._bytes > self._max_bytes)):
+                evicted = cache.popitem(False)[1]
+                self._bytes -= evicted[1]
+        finally:
+            self._lock.release()
+
+    def _clear(self):
+        self._cache.clear()
+        self._bytes = 0
+
+    def clear(self):
+        """Forget all the cached results.
+        """
+        self._lock.acquire()
+        try:
+            self._clear()
+        finally:
+            self._lock.release()
+
+    def seg(self, sent):
+        """Segment a sentence, or get the cached result.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+
+        @return: a list of segmented words
+        """
+        key = (False, sent)
+        generation, words = self._get(key)
+        if words is None:
+            words = tuple(self._segmentor.seg(sent))
+            self._put(key, generation, words)
+        # the caller may modify the list
+        return list(words)
+
+    def seg_spans(self, sent):
+        """Segment a sentence into spans, or get the cached result.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+
+        @return: an array of the boundaries of words
+        """
+        key = (True, sent)
+        generation, cuts = self._get(key)
+        if cuts is None:
+            cuts = self._segmentor.seg_spans(sent)
+            self._put(key, generation, cuts)
+        return array("i", cuts)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __repr__(self):
+        return "<CachedSeg: %d cached, %d hits, %d misses>" % \
+               (len(self), self.hits, self.misses)
+
+
+def demo():
+    """Demo for CachedSeg
+    """
+    from mm import FMMSeg
+
+    fseg = FMMSeg(train=[u"结合", u"合成", u"分子", u"子时"])
+    seg = CachedSeg(fseg, max_size=2)
+    for sent in [u"结合成分子时", u"合成分子", u"结合成分子时", u"分子时"]:
+        print "/".join(seg.seg(sent)), seg
+
+    print "Dictionary changed"
+    fseg.add_words([u"成分"])
+    print "/".join(seg.seg(u"结合成分子时")), seg
+
+
+if __name__ == "__main__":
+    demo()
@@ -68,6 +68,28 @@ class BaseCorpusReader(object):
         for sent in self.tagged_sents():
             yield [word[0] for word in sent]
 
+    def weighted_sents(self):
+        """Get the distinct untagged sentences from the corpus, with
+        how many times each of them appears. Corpora repeat lots of
+        sentences, like datelines and boilerplate, and trainers
+        accepting weighted input only need to process each of them
+        once.
+
+        @return: a list of (sentence, count) tuples, where sentences
+        are tuples of words, in the order of their first appearances
+        """
+        index = {}
+        res = []
+        for sent in self.sents():
+            sent = tuple(sent)
+            idx = index.get(sent)
+            if idx is None:
+                index[sent] = len(res)
+                res.append([sent, 1])
+            else:
+                res[idx][1] += 1
+        return [(sent, count) for sent, count in res]
+
     def paras(self):
         """Get untagged paragraphs from the corpus. Paragraphs are
         organized as lists of sentences, and sentences are in the same
@@ -152,6 +174,9 @@ if __name__ == "__main__":
     print "-" * 20, "Sentences", "-" * 20
     for i in d.sents():
         print repr(i)
+    print "-" * 20, "Weighted sentences", "-" * 20
+    for i in d.weighted_sents():
+        print repr(i)
     print "-" * 20, "Paragraphs", "-" * 20
     for i in d.paras():
         print repr(i)
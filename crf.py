@@ -14,6 +14,9 @@
 __all__ = ["CRFTagger"]
 
 
+import Queue
+import threading
+
 import CRFPP
 import tagset
 from entity import *
@@ -22,32 +25,94 @@ class CRFTagger(object):
     """An unigram tagger
     """
 
+    # CRF++ decodes whole sentences, see BatchTagger
+    whole_sentence = True
+
     def __init__(self, tag_set):
         """Constructor
         """
         self.tag_set = tag_set
         self.seg_o = tagset.TagSeg(tag_set, self.tag) # 创建相应的切分器
+        # encoded input lines of characters, they never change
+        self._lines = {}
+        self.generation = 0
 
         #self.prepareCharClassification()
 
-    def use_model(self, model_path):
+    def use_model(self, model_path, pool_size=1):
         """
         use a alread trained model.
 
+        A CRF++ tagger holds the sentence being tagged, so it can only
+        be used by one thread at a time. Up to pool_size taggers are
+        loaded from the model, when there are so many threads tagging
+        at the same time, and each call checks one out of the pool.
+
         @type modelPath: string
         @param modelPath: the path of the model file
+        @type pool_size: positive integer
+        @param pool_size: the most taggers to be loaded
         """
         #self.model = modelPath
+        self._model_path = model_path
+        self._pool_size = pool_size
+        self._pool = Queue.Queue()
+        self._pool_lock = threading.Lock()
         self.tagger = CRFPP.Tagger("-m %s -v3" % model_path)
+        self._loaded = 1
+        self._pool.put(self.tagger)
+        self.generation += 1
 
-    def prepare_train_data(self, train_data, out_stream):
+    def _checkout(self):
+        """Take a tagger out of the pool, loading a new one if all of
+        them are busy and there can be more.
+        """
+        try:
+            return self._pool.get_nowait()
+        except Queue.Empty:
+            pass
+        self._pool_lock.acquire()
+        try:
+            load = self._loaded < self._pool_size
+            if load:
+                self._loaded += 1
+        finally:
+            self._pool_lock.release()
+        if load:
+            return CRFPP.Tagger("-m %s -v3" % self._model_path)
+        return self._pool.get()
+
+    def _line(self, char):
+        line = self._lines.get(char)
+        if line is None:
+            line = self._lines[char] = ("%s\t%s" % (char, self.char_property(char))).encode('utf8')
+        return line
+
+    def prepare_train_data(self, train_data, out_stream, weighted=False):
         """Prepare a txt file for CRF++ to train
 
-        @type trainData: iterable of words
+        If weighted, each distinct sentence is formatted once, and
+        written count times. As without weights, no empty lines are
+        written between sentences, so the file is what the words of
+        all the copies would give, in the order of the weighted
+        sentences. CRF++ has no weights for its training data, so it
+        still trains on every copy.
+
+        @type trainData: iterable of words, or of (sentence, count)
+        tuples if weighted
         @param trainData: training set
         @type outPath: string
         @param outPath: the path and name of the output file
+        @type weighted: bool
+        @param weighted: whether trainData is weighted sentences, e.g.
+        from BaseCorpusReader.weighted_sents()
         """
+        if weighted:
+            for sent, count in train_data:
+                lines = "".join([("%s\t%s\t%s\n" % (char, self.char_property(char), tag)).encode('utf8')
+                                 for char, tag in self.tag_set.tag(sent)])
+                out_stream.write(lines * count)
+            return
         for char, tag in self.tag_set.tag(train_data):
             out_stream.write(("%s\t%s\t%s\n" % (char, self.char_property(char), tag)).encode('utf8'))
 
@@ -63,32 +128,63 @@ class CRFTagger(object):
         @type c: a character
         @param c: a character to be analyzed
         """
-        if c in num_list:
-            return "NUM"
-        elif c in date_list:
-            return "DATE"
-        elif c in letter_list:
-            return "LETTER"
-        else:
-            return "NORMAL"
+        return char_property(c)
 
-    def tag(self, sent):
-        """Tag raw sent into (char, tag) tuple"""
-        self.tagger.clear()
+    def _tag(self, tagger, sent):
+        tagger.clear()
 
         # Add characters into tagger
+        lines = self._lines
+        add = tagger.add
         for i in sent:
-            self.tagger.add(("%s\t%s" % (i, self.char_property(i))).encode('utf8'))
+            line = lines.get(i)
+            if line is None:
+                line = self._line(i)
+            add(line)
+
+        tagger.parse()
 
-        self.tagger.parse()
+        y2 = tagger.y2
+        return zip(sent, [y2(i) for i in xrange(tagger.size())])
 
-        size = self.tagger.size()
-        xsize = self.tagger.xsize()
-        for i in range(0, (size)):
-           yield (self.tagger.x(i, 0).decode('utf8'), self.tagger.y2(i))
+    def tag(self, sent):
+        """Tag raw sent into (char, tag) tuple"""
+        tagger = self._checkout()
+        try:
+            return iter(self._tag(tagger, sent))
+        finally:
+            self._pool.put(tagger)
+
+    def tag_many(self, sents):
+        """Tag many raw sentences with one tagger from the pool.
+
+        @type sents: iterable of unicode strings
+        @param sents: the sentences to be tagged
+        @return: a list of lists of (char, tag) tuples
+        """
+        tagger = self._checkout()
+        try:
+            return [self._tag(tagger, sent) for sent in sents]
+        finally:
+            self._pool.put(tagger)
 
     def seg(self, sent, verbose=False):
         """Segment a string and return a list of words
         """
 
         return self.seg_o.seg(sent,verbose=verbose)
+
+    def seg_spans(self, sent, verbose=False):
+        """Segment a string and return an array of the boundaries of
+        words, see TagSeg.seg_spans()
+        """
+        return self.seg_o.seg_spans(sent, verbose=verbose)
+
+    def seg_many(self, sents):
+        """Segment many strings with one tagger from the pool, see
+        tag_many().
+
+        @return: a list of lists of segmented words
+        """
+        untag = self.tag_set.untag
+        return [list(untag(tagged, False)) for tagged in self.tag_many(sents)]
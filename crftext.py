@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""CRF segmentor decoding CRF++ text models without CRF++
+"""
+__all__ = ["CRFTextTagger"]
+
+import re
+
+import numpy
+
+import tagset
+from entity import *
+from hmm import viterbi
+
+_MACRO = re.compile(r"%x\[(-?\d+),(\d+)\]")
+# bits of a value code, when the codes of a template are packed
+_BITS = 21
+
+class _Template(object):
+    """A compiled feature template, like U01:%x[-1,0]/%x[0,0]
+    """
+
+    def __init__(self, template):
+        # literal parts around the macros, and the (row, col) of each
+        self.parts = _MACRO.split(template)[::3]
+        self.refs = [(int(row), int(col))
+                     for row, col in _MACRO.findall(template)]
+        # feature ids of the values the macros expand to
+        self.ids = {}
+
+    def expand(self, values):
+        res = [self.parts[0]]
+        for value, part in zip(values, self.parts[1:]):
+            res.append(value)
+            res.append(part)
+        return "".join(res)
+
+
+class CRFTextTagger(tagset.BatchTagger):
+    """A tagger decoding models trained by CRF++, in the text format
+    written by crf_learn -t, with NumPy instead of CRF++.
+
+    The feature templates are compiled into look-ups from the values
+    their macros expand to, to the feature ids. Many sentences can be
+    decoded at a time: their scores are gathered from the weights in
+    a few array operations, and the best tag sequences found by
+    hmm.viterbi() in a single pass.
+
+    The columns of the model must be the characters and their
+    properties, as written by CRFTagger.prepare_train_data().
+    """
+
+    def __init__(self, tag_set, model_path):
+        """Load a CRF++ text model.
+
+        @type tag_set: TagSet
+        @param tag_set: the tag set the model is trained with
+        @type model_path: string
+        @param model_path: the path of the text model file
+        """
+        self.tag_set = tag_set
+        self.seg_o = tagset.TagSeg(tag_set, self.tag)
+        # codes of column values, and the columns of characters
+        self._codes = {}
+        self._values = []
+        self._rows = {}
+        self._load(model_path)
+
+    def _load(self, model_path):
+        model_file = open(model_path, "rU")
+        try:
+            def section():
+                res = []
+                for line in model_file:
+                    line = line.rstrip("\n")
+                    if not line:
+                        break
+                    res.append(line)
+                return res
+
+            header = dict(line.split(": ", 1) for line in section())
+            self.labels = section()
+            unigrams = []
+            bigrams = []
+            for template in section():
+                template = template.decode("utf8")
+                if template.startswith("U"):
+                    unigrams.append(_Template(template))
+                elif template.startswith("B"):
+                    bigrams.append(_Template(template))
+            features = {}
+            for line in section():
+                fid, feature = line.split(" ", 1)
+                features[feature.decode("utf8")] = int(fid)
+            weights = numpy.array([float(line) for line in model_file
+                                   if line.strip()])
+        finally:
+            model_file.close()
+        if len(weights) != int(header["maxid"]):
+            raise ValueError("%s has %d weights, maxid is %s" %
+                             (model_path, len(weights), header["maxid"]))
+        self.xsize = int(header["xsize"])
+        if self.xsize != 2:
+            raise ValueError("%s has %d columns, not characters and their "
+                             "properties" % (model_path, self.xsize))
+        self._unigrams = unigrams
+        self._bigrams = bigrams
+        self._features = features
+        width = len(self.labels)
+        # a missing feature is given the id of the zeros at the end
+        self._missing = len(weights)
+        self._weights = numpy.concatenate([weights,
+                                           numpy.zeros(width * width)])
+        # transitions of bigram templates without macros, like B
+        self._trans = numpy.zeros((width, width))
+        for template in bigrams:
+            if not template.refs:
+                fid = features.get(template.expand(()))
+                if fid is not None:
+                    self._trans += weights[fid:fid + width * width].reshape(
+                        width, width)
+
+    def _code(self, value):
+        """Get the code of a column value, e.g. a character, a property
+        or a placeholder like _B-1 for positions out of the sentence.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def _observe(self, sents, length):
+        """Turn a batch of sentences into the codes of their columns.
+
+        @return: an array of shape (count, length, xsize)
+        """
+        rows = self._rows
+        res = numpy.zeros((len(sents), length, self.xsize),
+                          dtype=numpy.int64)
+        for i, sent in enumerate(sents):
+            codes = []
+            for char in sent:
+                row = rows.get(char)
+                if row is None:
+                    row = rows[char] = (self._code(char),
+                                        self._code(char_property(char)))
+                codes.append(row)
+            if codes:
+                res[i, :len(sent)] = codes
+        return res
+
+    def _shift(self, codes, lengths, row, col):
+        """Get the values a macro %x[row,col] expands to, at every
+        position of a batch.
+
+        @return: an array of shape (count, length) of value codes
+        """
+        length = codes.shape[1]
+        idx = numpy.arange(length) + row
+        res = codes[:, numpy.clip(idx, 0, length - 1), col]
+        for pos in numpy.nonzero(idx < 0)[0]:
+            res[:, pos] = self._code("_B-%d" % -idx[pos])
+        beyond = idx - lengths[:, numpy.newaxis] + 1
+        over = beyond > 0
+        if over.any():
+            marks = numpy.array([0] + [self._code("_B+%d" % i) for i in
+                                       xrange(1, beyond.max() + 1)])
+            res[over] = marks[beyond[over]]
+        return res
+
+    def _feature_ids(self, template, codes, lengths):
+        """Find the feature ids of a template at every position of a
+        batch. The values its macros expand to are looked up once for
+        each distinct combination in the batch.
+
+        @return: an array of shape (count, length), with self._missing
+        for unknown features
+        """
+        count, length = codes.shape[:2]
+        if not template.refs:
+            res = numpy.empty((count, length), dtype=numpy.int64)
+            res.fill(self._features.get(template.expand(()), self._missing))
+            return res
+        shifts = [self._shift(codes, lengths, row, col)
+                  for row, col in template.refs]
+        refs = len(shifts)
+        if refs * _BITS < 64 and len(self._values) < 1 << _BITS:
+            # pack the codes into one integer, much faster to sort
+            keys = shifts[0].ravel()
+            for shift in shifts[1:]:
+                keys = (keys << _BITS) | shift.ravel()
+            distinct, inverse = numpy.unique(keys, return_inverse=True)
+            mask = (1 << _BITS) - 1
+            distinct = numpy.column_stack(
+                [(distinct >> (_BITS * (refs - 1 - i))) & mask
+                 for i in xrange(refs)])
+        else:
+            keys = numpy.dstack(shifts).reshape(count * length, refs)
+            distinct, inverse = numpy.unique(keys, axis=0,
+                                             return_inverse=True)
+        ids = template.ids
+        fids = numpy.empty(len(distinct), dtype=numpy.int64)
+        for i, key in enumerate(distinct.tolist()):
+            key = tuple(key)
+            fid = ids.get(key)
+            if fid is None:
+                feature = template.expand([self._values[c] for c in key])
+                fid = ids[key] = self._features.get(feature, self._missing)
+            fids[i] = fid
+        return fids[inverse].reshape(count, length)
+
+    def _scores(self, sents):
+        """Gather the scores of a batch of sentences.
+
+        @return: the unigram scores of shape (count, length, width),
+        and the transitions, of shape (width, width) or (count,
+        length, width, width)
+        """
+        width = len(self.labels)
+        lengths = numpy.array([len(i) for i in sents])
+        count = len(sents)
+        length = lengths.max()
+        weights = self._weights
+        codes = self._observe(sents, length)
+        scores = numpy.zeros((count, length, width))
+        for template in self._unigrams:
+            fids = self._feature_ids(template, codes, lengths)
+            scores += weights[fids[..., numpy.newaxis] + numpy.arange(width)]
+        bigrams = [template for template in self._bigrams if template.refs]
+        if not bigrams:
+            return scores, self._trans
+        trans = numpy.zeros((count, length, width * width))
+        for template in bigrams:
+            fids = self._feature_ids(template, codes, lengths)
+            trans += weights[fids[..., numpy.newaxis] +
+                             numpy.arange(width * width)]
+        trans = trans.reshape(count, length, width, width) + self._trans
+        return scores, trans
+
+    def _decode(self, batch):
+        """Decode a batch of sentences in a single Viterbi pass.
+
+        @return: a list of lists of labels, one for each sentence,
+        padded to the longest sentence
+        """
+        scores, trans = self._scores(batch)
+        lengths = numpy.array([len(i) for i in batch])
+        labels = self.labels
+        return [[labels[t] for t in tags]
+                for tags in viterbi(scores, trans, lengths).tolist()]
+
+    def __repr__(self):
+        return "<CRFTextTagger: %d features, %d labels>" % \
+               (len(self._features), len(self.labels))
+
+
+def demo():
+    """Demo for CRFTextTagger, with a tiny hand written model
+    """
+    import os
+    import tempfile
+
+    # B E S, a unigram template of the character, and transitions
+    model = u"""version: 100
+cost-factor: 1
+maxid: 21
+xsize: 2
+
+B
+E
+S
+
+U00:%x[0,0]
+U01:%x[-1,0]
+B
+
+0 B
+9 U00:结
+12 U00:合
+15 U01:结
+18 U01:_B-1
+
+-5
+2
+-5
+0
+0
+0
+0
+-5
+0
+2
+0
+0
+0
+2
+0
+0
+1
+0
+1
+-5
+1
+"""
+    handle, path = tempfile.mkstemp()
+    try:
+        model_file = os.fdopen(handle, "w")
+        model_file.write(model.encode("utf8"))
+        model_file.close()
+        tagger = CRFTextTagger(tagset.BESTagSet(), path)
+    finally:
+        os.remove(path)
+    print tagger
+    for sent in [u"结合", u"合结合"]:
+        print " ".join(["%s/%s" % i for i in tagger.tag(sent)]),
+        print "/".join(tagger.seg(sent))
+
+
+if __name__ == "__main__":
+    demo()
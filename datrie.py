@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Double-array trie for read-only dictionaries
+"""
+__all__ = ["FrozenTrie", "MappedTrie"]
+
+import mmap
+import struct
+import sys
+from array import array
+
+from trie import Trie
+
+# how many free slots to try for a node before giving up and putting
+# it at the end of the arrays
+_MAX_TRIES = 256
+
+# the most frequent _DIRECT elements take one transition, the others
+# take two: a first one on the high digit, then one on the low digit
+_DIRECT = 127
+_RADIX = 128
+_SHIFT = 16
+_MASK = (1 << _SHIFT) - 1
+
+# file format for FrozenTrie.save() and MappedTrie, little-endian:
+#   header: magic, number of codes, number of states
+#   codes: (code point of element, code) for each element
+#   states: (base, check, value) for each state
+_MAGIC = "PYCIDAT1"
+_HEADER = struct.Struct("<8sII")
+_CODE = struct.Struct("<Ii")
+_STATE = struct.Struct("<iii")
+_NO_VALUE = -2 ** 31
+
+class FrozenTrie(object):
+    """A read-only trie stored in a double array.
+
+    Every state s of the trie is an index into two integer arrays,
+    base and check. The transition from s on an element coded c goes
+    to t = base[s] + c, and it exists iff check[t] == s. For details,
+    see Aoe, J. An Efficient Digital Search Algorithm by Using a
+    Double-Array Structure, 1989.
+
+    Elements are coded by frequency. As a Chinese dictionary has
+    thousands of distinct characters, only the most frequent ones are
+    coded as a single transition, while the rest go through an extra
+    intermediate state. This keeps the number of transitions out of
+    any state small, so that the arrays can be packed densely.
+
+    FrozenTrie provides the same look-up interface as Trie, but it
+    can not be modified after construction.
+    """
+
+    def __init__(self, keys=None, value=lambda x:0, trie=None):
+        """Construct a frozen trie from keys, or from an existing trie.
+
+        @type keys: iterable of random accessible objects with
+        hashable elements
+        @param keys: keys from which the trie is constructed
+        @type value: callable
+        @param value: method to get values from keys, default sets
+        everything to 0
+        @type trie: Trie
+        @param trie: a trie to be frozen, if provided, keys and value
+        are ignored
+        """
+        if trie is None:
+            trie = Trie(keys, value)
+        self._build(trie._trie_root)
+
+    def _build(self, root):
+        """Lay out the trie rooted at root into base/check arrays.
+
+        @type root: TrieNode
+        @param root: the root of the trie to be frozen
+        """
+        # code elements by their frequency, most frequent first
+        freq = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for label, child in node._child.iteritems():
+                freq[label] = freq.get(label, 0) + 1
+                stack.append(child)
+        labels = sorted(freq, key=lambda x: -freq[x])
+        code = {}
+        max_code = _RADIX
+        for i, label in enumerate(labels):
+            if i < _DIRECT:
+                code[label] = i + 1
+            else:
+                high, low = divmod(i - _DIRECT, _RADIX)
+                high += _DIRECT + 1
+                max_code = max(max_code, high)
+                code[label] = (high << _SHIFT) | (low + 1)
+
+        def transitions(node):
+            # intermediate states are lists of (low digit, TrieNode)
+            if isinstance(node, list):
+                return sorted(node)
+            res = []
+            groups = {}
+            for label, child in node._child.iteritems():
+                c = code[label]
+                if c > _DIRECT:
+                    groups.setdefault(c >> _SHIFT, []).append(
+                        (c & _MASK, child))
+                else:
+                    res.append((c, child))
+            res.extend(groups.iteritems())
+            res.sort()
+            return res
+
+        # check[t] == -1 means state t is free, the root is state 0
+        size = max_code + 1
+        base = array('i', [0] * size)
+        check = array('i', [-1] * size)
+        values = [None] * size
+        used = bytearray(size)
+        check[0] = 0
+        values[0] = root._value
+        used[0] = 1
+        first_free = 1
+
+        queue = [(root, 0)]
+        for node, state in queue:
+            children = transitions(node)
+            if not children:
+                continue
+            low = children[0][0]
+            # find a base so that every child falls into a free slot
+            pos = max(first_free, low)
+            skipped = 0
+            tries = 0
+            while True:
+                nxt = used.find('\x00', pos)
+                if nxt == -1 or tries == _MAX_TRIES:
+                    # past the end everything is free
+                    pos = max(pos, size)
+                else:
+                    skipped += nxt - pos
+                    pos = nxt
+                b = pos - low
+                if all(b + c >= size or not used[b + c]
+                       for c, child in children):
+                    break
+                pos += 1
+                tries += 1
+            top = b + children[-1][0] + 1
+            if top > size:
+                grow = top - size
+                base.extend([0] * grow)
+                check.extend([-1] * grow)
+                values.extend([None] * grow)
+                used.extend(bytearray(grow))
+                size = top
+            base[state] = b
+            for c, child in children:
+                check[b + c] = state
+                if not isinstance(child, list):
+                    values[b + c] = child._value
+                used[b + c] = 1
+                queue.append((child, b + c))
+            # like darts, stop looking into a crowded area
+            if pos > first_free and \
+               skipped >= 0.95 * (pos - first_free):
+                first_free = pos
+            nxt = used.find('\x00', first_free)
+            first_free = size if nxt == -1 else nxt
+        # pad the arrays so that base[s] + c never runs off the end
+        pad = max(base) + max_code + 1 - size
+        if pad > 0:
+            base.extend([0] * pad)
+            check.extend([-1] * pad)
+            values.extend([None] * pad)
+
+        self._code = code
+        self._base = base
+        self._check = check
+        self._values = values
+
+    def _step(self, state, element):
+        """Take the transition from state on element, which is two
+        transitions for elements with a high code.
+
+        @return: the next state, or None if there is no transition
+        """
+        c = self._code.get(element)
+        if c is None:
+            return None
+        base = self._base
+        check = self._check
+        if c > _DIRECT:
+            nxt = base[state] + (c >> _SHIFT)
+            if check[nxt] != state:
+                return None
+            state = nxt
+            c &= _MASK
+        nxt = base[state] + c
+        if check[nxt] != state:
+            return None
+        return nxt
+
+    def _walk(self, key):
+        """Find the state for key.
+
+        @return: the state, or None if there is no such state
+        """
+        step = self._step
+        state = 0
+        for element in key:
+            state = step(state, element)
+            if state is None:
+                return None
+        return state
+
+    def __getitem__(self, key):
+        state = self._walk(key)
+        if state is None or self._values[state] is None:
+            raise KeyError
+        return self._values[state]
+
+    def __setitem__(self, key, value):
+        raise TypeError("FrozenTrie is read-only")
+
+    def longest_prefix(self, seq, offset=0):
+        """Find the longest prefix of seq starting at offset that is
+        in the trie.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest prefix will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: the index of the element next to the longest prefix
+        """
+        step = self._step
+        values = self._values
+        state = 0
+        found = offset if values[0] is not None else None
+        for idx in xrange(offset, len(seq)):
+            state = step(state, seq[idx])
+            if state is None:
+                break
+            if values[state] is not None:
+                found = idx + 1
+        return found
+
+    def prefixes(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the trie.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over the index of the element
+        next to each prefix, shortest prefix first
+        """
+        step = self._step
+        values = self._values
+        state = 0
+        if values[0] is not None:
+            yield offset
+        for idx in xrange(offset, len(seq)):
+            state = step(state, seq[idx])
+            if state is None:
+                break
+            if values[state] is not None:
+                yield idx + 1
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, whose reverse
+        is in the trie. This walks the trie backwards over seq, so the
+        trie should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffix
+
+        @return: the starting index of the longest suffix
+        """
+        step = self._step
+        values = self._values
+        state = 0
+        found = end if values[0] is not None else None
+        for idx in xrange(end - 1, -1, -1):
+            state = step(state, seq[idx])
+            if state is None:
+                break
+            if values[state] is not None:
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, whose reverses
+        are in the trie. This walks the trie backwards over seq, so the
+        trie should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffixes
+
+        @return: a generator iterates over the starting index of each
+        suffix, shortest suffix first
+        """
+        step = self._step
+        values = self._values
+        state = 0
+        if values[0] is not None:
+            yield end
+        for idx in xrange(end - 1, -1, -1):
+            state = step(state, seq[idx])
+            if state is None:
+                break
+            if values[state] is not None:
+                yield idx
+
+    def save(self, path):
+        """Save the trie into a file, which can be mapped into memory
+        later by MappedTrie.
+
+        Only tries whose elements are unicode characters and whose
+        values are 32-bit integers can be saved.
+
+        @type path: string
+        @param path: the path for the trie file
+        """
+        size = len(self._base)
+        values = array('i', [0] * size)
+        for state, value in enumerate(self._values):
+            if value is None:
+                value = _NO_VALUE
+            elif not isinstance(value, (int, long)) or \
+                 not _NO_VALUE < value < 2 ** 31:
+                raise TypeError("only 32-bit integer values can be saved")
+            values[state] = value
+        states = array('i', [0] * (3 * size))
+        states[0::3] = self._base
+        states[1::3] = self._check
+        states[2::3] = values
+        if sys.byteorder == "big":
+            states.byteswap()
+
+        out = open(path, "wb")
+        try:
+            out.write(_HEADER.pack(_MAGIC, len(self._code), size))
+            for element, c in sorted(self._code.iteritems(),
+                                     key=lambda x: x[1]):
+                out.write(_CODE.pack(ord(element), c))
+            states.tofile(out)
+        finally:
+            out.close()
+
+    def __copy__(self):
+        # read-only, so it's safe to share
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "<FrozenTrie: 0x%08x>" % id(self)
+
+
+class MappedTrie(object):
+    """A read-only trie mapped from a file written by FrozenTrie.save().
+
+    The states are read in place from the mapped file instead of
+    being loaded, so opening a trie is almost free, and all processes
+    mapping the same file share a single copy in the page cache. Only
+    the element codes are loaded into memory.
+
+    MappedTrie provides the same look-up interface as Trie.
+    """
+
+    def __init__(self, path):
+        """Map a trie file into memory.
+
+        @type path: string
+        @param path: the path for the trie file
+        """
+        self._path = path
+        self._open()
+
+    def _open(self):
+        trie_file = open(self._path, "rb")
+        try:
+            self._mmap = mmap.mmap(trie_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        finally:
+            trie_file.close()
+        magic, ncodes, nstates = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError("%s is not a trie file" % self._path)
+        code = {}
+        offset = _HEADER.size
+        for i in xrange(ncodes):
+            element, c = _CODE.unpack_from(self._mmap, offset)
+            code[unichr(element)] = c
+            offset += _CODE.size
+        self._code = code
+        self._start = offset
+
+    def close(self):
+        """Unmap the trie file.
+        """
+        self._mmap.close()
+
+    def _root(self):
+        """Read the root state.
+
+        @return: a (state, base, value) tuple
+        """
+        b, chk, value = _STATE.unpack_from(self._mmap, self._start)
+        return 0, b, value
+
+    def _step(self, node, element):
+        """Take the transition from a state on element, see
+        FrozenTrie._step().
+
+        @type node: (state, base, value) tuple
+        @param node: the state, with its base and value
+        @return: the next (state, base, value) tuple, or None if there
+        is no transition
+        """
+        c = self._code.get(element)
+        if c is None:
+            return None
+        state, b, value = node
+        mm = self._mmap
+        start = self._start
+        read = _STATE.unpack_from
+        if c > _DIRECT:
+            nxt = b + (c >> _SHIFT)
+            b, chk, value = read(mm, start + nxt * _STATE.size)
+            if chk != state:
+                return None
+            state = nxt
+            c &= _MASK
+        nxt = b + c
+        b, chk, value = read(mm, start + nxt * _STATE.size)
+        if chk != state:
+            return None
+        return nxt, b, value
+
+    def _walk(self, key):
+        """Find the state for key.
+
+        @return: the (state, base, value) tuple, or None if there is no
+        such state
+        """
+        step = self._step
+        node = self._root()
+        for element in key:
+            node = step(node, element)
+            if node is None:
+                return None
+        return node
+
+    def __getitem__(self, key):
+        node = self._walk(key)
+        if node is None or node[2] == _NO_VALUE:
+            raise KeyError
+        return node[2]
+
+    def __setitem__(self, key, value):
+        raise TypeError("MappedTrie is read-only")
+
+    def longest_prefix(self, seq, offset=0):
+        """See FrozenTrie.longest_prefix()
+        """
+        step = self._step
+        node = self._root()
+        found = offset if node[2] != _NO_VALUE else None
+        for idx in xrange(offset, len(seq)):
+            node = step(node, seq[idx])
+            if node is None:
+                break
+            if node[2] != _NO_VALUE:
+                found = idx + 1
+        return found
+
+    def prefixes(self, seq, offset=0):
+        """See FrozenTrie.prefixes()
+        """
+        step = self._step
+        node = self._root()
+        if node[2] != _NO_VALUE:
+            yield offset
+        for idx in xrange(offset, len(seq)):
+            node = step(node, seq[idx])
+            if node is None:
+                break
+            if node[2] != _NO_VALUE:
+                yield idx + 1
+
+    def longest_suffix(self, seq, end):
+        """See FrozenTrie.longest_suffix()
+        """
+        step = self._step
+        node = self._root()
+        found = end if node[2] != _NO_VALUE else None
+        for idx in xrange(end - 1, -1, -1):
+            node = step(node, seq[idx])
+            if node is None:
+                break
+            if node[2] != _NO_VALUE:
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """See FrozenTrie.suffixes()
+        """
+        step = self._step
+        node = self._root()
+        if node[2] != _NO_VALUE:
+            yield end
+        for idx in xrange(end - 1, -1, -1):
+            node = step(node, seq[idx])
+            if node is None:
+                break
+            if node[2] != _NO_VALUE:
+                yield idx
+
+    def __copy__(self):
+        # read-only, so it's safe to share
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        # map the file again instead of pickling its content
+        return {"_path": self._path}
+
+    def __setstate__(self, state):
+        self._path = state["_path"]
+        self._open()
+
+    def __repr__(self):
+        return "<MappedTrie: %s>" % self._path
+
+
+def demo():
+    """Demo for FrozenTrie, and a comparison against Trie
+    """
+    import random
+    import sys
+    import time
+
+    words = ["ABC", "ABD", "ABCD", "BCD"]
+    ftrie = FrozenTrie(words)
+    sent = "ABCEABABCDF"
+    print words, sent
+    print "longest prefix at 0:", sent[:ftrie.longest_prefix(sent)]
+    print "all prefixes at 6:", [sent[6:i] for i in ftrie.prefixes(sent, 6)]
+    try:
+        ftrie["ABC"] = 1
+    except TypeError, e:
+        print e
+
+    import os
+    import tempfile
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    ftrie.save(path)
+    mtrie = MappedTrie(path)
+    print mtrie, "ABCD:", mtrie["ABCD"],
+    print "longest prefix at 6:", sent[6:mtrie.longest_prefix(sent, 6)]
+    mtrie.close()
+    os.remove(path)
+
+    def trie_size(trie):
+        total = sys.getsizeof(trie)
+        stack = [trie._trie_root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node) + sys.getsizeof(node._child)
+            if hasattr(node, "__dict__"):
+                total += sys.getsizeof(node.__dict__)
+            stack.extend(node._child.itervalues())
+        return total
+
+    def frozen_size(trie):
+        return sys.getsizeof(trie) + sys.getsizeof(trie._code) + \
+               sys.getsizeof(trie._base) + sys.getsizeof(trie._check) + \
+               sys.getsizeof(trie._values)
+
+    def lookups(trie, sent):
+        start = time.time()
+        offset = 0
+        while offset < len(sent):
+            offset = (trie.longest_prefix(sent, offset) or offset) + 1
+        return time.time() - start
+
+    print "\nComparison with Trie on a random lexicon"
+    rand = random.Random(0)
+    alphabet = [unichr(i) for i in xrange(0x4e00, 0x4e00 + 3000)]
+    words = set()
+    while len(words) < 50000:
+        words.add(u"".join(rand.choice(alphabet)
+                           for i in xrange(rand.choice([1, 2, 2, 2, 3, 4]))))
+    trie = Trie(words)
+    ftrie = FrozenTrie(trie=trie)
+    sent = u"".join(rand.choice(alphabet) for i in xrange(200000))
+    print "Trie:       %10d bytes, %.3fs" % (trie_size(trie),
+                                             lookups(trie, sent))
+    print "FrozenTrie: %10d bytes, %.3fs" % (frozen_size(ftrie),
+                                             lookups(ftrie, sent))
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Directed acyclic word graph, i.e. minimal acyclic automaton, for
+large dictionaries
+"""
+__all__ = ["DAWG", "external_sort"]
+
+import heapq
+import tempfile
+
+class DAWG(object):
+    """A directed acyclic word graph is a trie whose equivalent subtrees
+    are merged, which is the minimal automaton accepting the keys. Many
+    Chinese words share their endings, like those ending in 机, 性 or
+    化, so a DAWG is much smaller than a trie of the same dictionary.
+
+    The DAWG is built in a single pass over sorted keys, minimizing
+    states as soon as no more keys can pass through them, so only the
+    minimal automaton itself and the path of the last key are ever in
+    memory. For details, see Daciuk, J. et al. Incremental
+    Construction of Minimal Acyclic Finite-State Automata, 2000.
+
+    A DAWG only knows which keys are in it, every key has the value
+    True. It provides the same look-up interface as Trie, but it can
+    not be modified after construction.
+    """
+
+    def __init__(self, keys=None, presorted=True, chunk_size=100000):
+        """Construct a DAWG from keys.
+
+        @type keys: iterable of strings
+        @param keys: keys from which the DAWG is constructed
+        @type presorted: bool
+        @param presorted: whether keys are already sorted, if not,
+        they are sorted by external_sort() first
+        @type chunk_size: positive integer
+        @param chunk_size: how many keys are sorted in memory at a
+        time when keys are not presorted
+        """
+        self._root = DAWGState()
+        self._register = {}
+        # path of the last key, as (parent, label, child) tuples,
+        # whose states have not been minimized yet
+        self._unchecked = []
+        self._last = None
+        if keys:
+            if not presorted:
+                keys = external_sort(keys, chunk_size)
+            for key in keys:
+                self._insert(key)
+        self._minimize(0)
+        # the register is only needed during construction
+        del self._register
+        del self._unchecked
+        del self._last
+
+    def _insert(self, key):
+        """Add a key, which must not be less than the last key added.
+        """
+        last = self._last
+        if last is not None:
+            if key == last:
+                return
+            if key < last:
+                raise ValueError("keys are not sorted: %r after %r" %
+                                 (key, last))
+        else:
+            last = ""
+        common = 0
+        for a, b in zip(key, last):
+            if a != b:
+                break
+            common += 1
+        # nothing after the common prefix can change anymore
+        self._minimize(common)
+        if self._unchecked:
+            node = self._unchecked[-1][2]
+        else:
+            node = self._root
+        for label in key[common:]:
+            child = DAWGState()
+            node._edges[label] = child
+            self._unchecked.append((node, label, child))
+            node = child
+        node._final = True
+        self._last = key
+
+    def _minimize(self, depth):
+        """Merge the states deeper than depth on the path of the last
+        key into equivalent states already registered.
+        """
+        unchecked = self._unchecked
+        register = self._register
+        while len(unchecked) > depth:
+            parent, label, child = unchecked.pop()
+            sig = child._signature()
+            same = register.get(sig)
+            if same is None:
+                register[sig] = child
+            else:
+                parent._edges[label] = same
+
+    def __contains__(self, key):
+        node = self._root
+        for element in key:
+            node = node._edges.get(element)
+            if node is None:
+                return False
+        return node._final
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError
+        return True
+
+    def __setitem__(self, key, value):
+        raise TypeError("DAWG is read-only")
+
+    def longest_prefix(self, seq, offset=0):
+        """Find the longest prefix of seq starting at offset that is
+        in the DAWG.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest prefix will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: the index of the element next to the longest prefix
+        """
+        node = self._root
+        found = offset if node._final else None
+        for idx in xrange(offset, len(seq)):
+            node = node._edges.get(seq[idx])
+            if node is None:
+                break
+            if node._final:
+                found = idx + 1
+        return found
+
+    def prefixes(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the DAWG.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over the index of the element
+        next to each prefix, shortest prefix first
+        """
+        node = self._root
+        if node._final:
+            yield offset
+        for idx in xrange(offset, len(seq)):
+            node = node._edges.get(seq[idx])
+            if node is None:
+                break
+            if node._final:
+                yield idx + 1
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, whose reverse
+        is in the DAWG. This walks the DAWG backwards over seq, so the
+        DAWG should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffix
+
+        @return: the starting index of the longest suffix
+        """
+        node = self._root
+        found = end if node._final else None
+        for idx in xrange(end - 1, -1, -1):
+            node = node._edges.get(seq[idx])
+            if node is None:
+                break
+            if node._final:
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, whose reverses
+        are in the DAWG. This walks the DAWG backwards over seq, so the
+        DAWG should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffixes
+
+        @return: a generator iterates over the starting index of each
+        suffix, shortest suffix first
+        """
+        node = self._root
+        if node._final:
+            yield end
+        for idx in xrange(end - 1, -1, -1):
+            node = node._edges.get(seq[idx])
+            if node is None:
+                break
+            if node._final:
+                yield idx
+
+    def num_states(self):
+        """Count the states of the DAWG.
+
+        @return: the number of states
+        """
+        seen = set([id(self._root)])
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for child in node._edges.itervalues():
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return len(seen)
+
+    def __copy__(self):
+        # read-only, so it's safe to share
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "<DAWG: 0x%08x>" % id(self)
+
+
+class DAWGState(object):
+    """A state of a DAWG -- you should use class DAWG to access data
+    stored here.
+    """
+    __slots__ = ("_edges", "_final")
+
+    def __init__(self):
+        self._edges = {}
+        self._final = False
+
+    def _signature(self):
+        """Two states are equivalent iff they have the same signature,
+        provided that their children are already minimized.
+        """
+        return (self._final,
+                tuple(sorted((label, id(child))
+                             for label, child in self._edges.iteritems())))
+
+    def __getstate__(self):
+        return (self._edges, self._final)
+
+    def __setstate__(self, state):
+        self._edges, self._final = state
+
+
+def external_sort(keys, chunk_size=100000, coding="utf-8"):
+    """Sort keys and remove duplicates, using bounded memory. Keys are
+    sorted in chunks of chunk_size, each chunk is written into a
+    temporary file, then all the chunks are merged.
+
+    @type keys: iterable of strings without newlines
+    @param keys: keys to be sorted
+    @type chunk_size: positive integer
+    @param chunk_size: how many keys are sorted in memory at a time
+    @type coding: string
+    @param coding: encoding for the temporary files
+
+    @return: a generator iterates over the sorted keys as unicode
+    strings
+    """
+    def dump(chunk):
+        chunk_file = tempfile.TemporaryFile()
+        for key in sorted(chunk):
+            if isinstance(key, unicode):
+                key = key.encode(coding)
+            chunk_file.write(key + "\n")
+        chunk_file.seek(0)
+        return chunk_file
+
+    def load(chunk_file):
+        for line in chunk_file:
+            yield line[:-1].decode(coding)
+        chunk_file.close()
+
+    files = []
+    chunk = []
+    for key in keys:
+        chunk.append(key)
+        if len(chunk) >= chunk_size:
+            files.append(dump(chunk))
+            chunk = []
+    if chunk:
+        files.append(dump(chunk))
+    del chunk
+
+    last = None
+    for key in heapq.merge(*[load(i) for i in files]):
+        if key != last:
+            yield key
+            last = key
+
+
+def demo():
+    """Demo for DAWG
+    """
+    words = [u"计算机", u"计算", u"电脑", u"手机", u"收音机", u"可能性",
+             u"现代化", u"可能", u"绿化", u"现代", u"收音"]
+    dawg = DAWG(words, presorted=False, chunk_size=4)
+    print " ".join(words)
+    print dawg.num_states(), "states"
+
+    sent = u"现代化的计算机和收音机"
+    offset = 0
+    res = []
+    while offset < len(sent):
+        idx = dawg.longest_prefix(sent, offset) or offset + 1
+        res.append(sent[offset:idx])
+        offset = idx
+    print "/".join(res)
+
+
+if __name__ == "__main__":
+    demo()
@@ -21,6 +21,15 @@ C_NUM = "NUM"
 C_DATE = "DATE"
 C_LETTER = "LETTER"
 C_OTHER = "OTHER"
+C_NORMAL = "NORMAL"
+
+# how unicode strings are encoded into arrays of code points, e.g.
+# numpy.frombuffer(sent.encode(POINT_CODING), dtype=POINT_DTYPE), which
+# must have one element per character, so narrow builds use UTF-16
+if len(u"\U00010000") == 1:
+    POINT_CODING, POINT_DTYPE = "utf-32-le", "<u4"
+else:
+    POINT_CODING, POINT_DTYPE = "utf-16-le", "<u2"
 
 def char_class(char):
     if char in num_list:
@@ -31,3 +40,17 @@ def char_class(char):
         return C_LETTER
     else:
         return C_OTHER
+
+def char_property(char):
+    """Get the property of a character, as in the second column of
+    the training data for CRF++. The same as char_class(), except that
+    other characters are NORMAL.
+    """
+    if char in num_list:
+        return C_NUM
+    elif char in date_list:
+        return C_DATE
+    elif char in letter_list:
+        return C_LETTER
+    else:
+        return C_NORMAL
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""First-order hidden Markov model segmentor using tagging technique
+"""
+__all__ = ["HMMTagger", "viterbi"]
+
+from itertools import islice
+
+import numpy
+
+from tagset import *
+from entity import POINT_CODING, POINT_DTYPE
+
+# how many tagged characters are counted at a time
+_BLOCK = 100000
+
+def viterbi(scores, trans, lengths, start=None, end=None):
+    """Find the best tag sequences of a batch of sentences in a single
+    pass, one position of all the sentences per step.
+
+    @type scores: array of shape (count, length, width)
+    @param scores: the score of each tag at each position of each
+    sentence, sentences shorter than length are padded
+    @type trans: array of shape (width, width), or (count, length,
+    width, width)
+    @param trans: the score of going from one tag to another, or to
+    each position of each sentence, which is not used for position 0
+    @type lengths: array of integers
+    @param lengths: the length of each sentence
+    @type start: array of shape (width,)
+    @param start: the score of starting with each tag, default to 0
+    @type end: array of shape (width,)
+    @param end: the score of ending with each tag, default to 0
+
+    @return: an array of shape (count, length) of the tags with the
+    highest total score, padded with the last tag of each sentence
+    """
+    count, length, width = scores.shape
+    # padding keeps the last tag of a sentence
+    stay = numpy.arange(width)
+    back = numpy.empty((length, count, width), dtype=numpy.int64)
+    score = scores[:, 0]
+    if start is not None:
+        score = score + start
+    for pos in xrange(1, length):
+        if trans.ndim == 2:
+            cand = score[:, :, numpy.newaxis] + trans
+        else:
+            cand = score[:, :, numpy.newaxis] + trans[:, pos]
+        back[pos] = cand.argmax(axis=1)
+        new = cand.max(axis=1) + scores[:, pos]
+        done = pos >= lengths
+        if done.any():
+            back[pos][done] = stay
+            new[done] = score[done]
+        score = new
+    if end is not None:
+        score = score + end
+    path = numpy.empty((count, length), dtype=numpy.int64)
+    cur = score.argmax(axis=1)
+    batch = numpy.arange(count)
+    for pos in xrange(length - 1, 0, -1):
+        path[:, pos] = cur
+        cur = back[pos][batch, cur]
+    path[:, 0] = cur
+    return path
+
+class HMMTagger(BatchTagger):
+    """A first-order hidden Markov model tagger, whose tags are the
+    hidden states, and characters the observations.
+
+    Sentences are decoded with the Viterbi algorithm in NumPy. Many
+    sentences can be decoded at a time: they are padded to the same
+    length and decoded in a single vectorized pass, one character
+    position per step.
+    """
+
+    def __init__(self, tagset, train=None, smoothing=0.5):
+        """Construct an HMM tagger.
+
+        @type tagset: TagSet
+        @param tagset: the tag set to train
+        @type train: iterable of words
+        @param train: training set
+        @type smoothing: positive float
+        @param smoothing: added to the count of every known character
+        and tag, when estimating the emission probabilities
+        """
+        self.tagset = tagset
+        self.tags = sorted(tagset.itags | tagset.otags)
+        self._columns = dict((tag, i) for i, tag in enumerate(self.tags))
+        self._smoothing = smoothing
+        width = len(self.tags)
+        # row 0 of emissions is for unknown characters
+        self._rows = {}
+        self._emit = numpy.zeros((1024, width), dtype=numpy.int64)
+        self._trans = numpy.zeros((width, width), dtype=numpy.int64)
+        self._last = None
+        # log probabilities, computed when needed
+        self._model = None
+        self.generation = 0
+        self.seg_o = TagSeg(tagset, self.tag)
+        if train:
+            self.add_words(train)
+
+    def add_words(self, train, weighted=False):
+        """Add words into the model.
+
+        @type train: iterable of words, or of (sentence, count) tuples
+        if weighted
+        @param train: training set
+        @type weighted: bool
+        @param weighted: whether train is weighted sentences, e.g. from
+        BaseCorpusReader.weighted_sents(), each of them is tagged once
+        and counted count times, transitions between sentences are
+        not counted then
+        """
+        if weighted:
+            block = []
+            weights = []
+            links = []
+            for sent, count in train:
+                tagged = list(self.tagset.tag(sent))
+                if not tagged:
+                    continue
+                block.extend(tagged)
+                weights.extend([count] * len(tagged))
+                links.append(0)
+                links.extend([count] * (len(tagged) - 1))
+                if len(block) >= _BLOCK:
+                    self._count(block, weights, links)
+                    block = []
+                    weights = []
+                    links = []
+            if block:
+                self._count(block, weights, links)
+        else:
+            tagged = self.tagset.tag(train)
+            while True:
+                block = list(islice(tagged, _BLOCK))
+                if not block:
+                    break
+                self._count(block)
+        self._model = None
+        self.generation += 1
+
+    def _count(self, block, weights=None, links=None):
+        """Count a block of (char, tag) tuples.
+
+        @param weights: how many times each character is counted,
+        default to once
+        @param links: how many times the transition into each
+        character is counted, default to once
+        """
+        rows = self._rows
+        columns = self._columns
+        obs = numpy.empty(len(block), dtype=numpy.int64)
+        states = numpy.empty(len(block), dtype=numpy.int64)
+        for i, (char, tag) in enumerate(block):
+            row = rows.get(char)
+            if row is None:
+                row = rows[char] = len(rows) + 1
+            col = columns.get(tag)
+            if col is None:
+                raise TagError("tag %r is not in the tag set" % (tag,))
+            obs[i] = row
+            states[i] = col
+        width = len(self.tags)
+        size = len(rows) + 1
+        if size > len(self._emit):
+            emit = numpy.zeros((max(size, 2 * len(self._emit)), width),
+                               dtype=numpy.int64)
+            emit[:len(self._emit)] = self._emit
+            self._emit = emit
+        self._emit[:size] += numpy.bincount(
+            obs * width + states, weights, minlength=size * width
+        ).reshape(size, width).astype(numpy.int64)
+        if links is None:
+            # transitions go across words, and across blocks
+            if self._last is not None:
+                self._trans[self._last, states[0]] += 1
+            links = numpy.ones(len(block) - 1)
+        else:
+            links = numpy.array(links[1:], dtype=numpy.float64)
+        self._trans += numpy.bincount(
+            states[:-1] * width + states[1:], links, minlength=width * width
+        ).reshape(width, width).astype(numpy.int64)
+        self._last = states[-1]
+
+    def _compile(self):
+        """Compute the log probabilities from the counts.
+        """
+        width = len(self.tags)
+        size = len(self._rows) + 1
+        counts = self._emit[:size].astype(numpy.float64)
+        counts[1:] += self._smoothing
+        totals = counts[1:].sum(axis=0)
+        totals[totals == 0] = 1
+        # a known character never seen with a tag gets the smoothed
+        # probability, an unknown character says nothing about the tag
+        emit = numpy.empty((size, width))
+        emit[0] = 0
+        emit[1:] = numpy.log(counts[1:] / totals)
+
+        trans = self._trans.astype(numpy.float64)
+        outgoing = trans.sum(axis=1)
+        outgoing[outgoing == 0] = 1
+        trans /= outgoing[:, numpy.newaxis]
+        initial = numpy.array([tag in self.tagset.itags
+                               for tag in self.tags])
+        # sentences start with a word, so with an initial tag in
+        # proportion to its count, and end where a word may start
+        start = self._emit[:size].sum(axis=0) * initial
+        start = start / float(max(start.sum(), 1))
+        end = trans[:, initial].sum(axis=1)
+
+        old = numpy.seterr(divide="ignore")
+        try:
+            self._model = (emit, numpy.log(trans), numpy.log(start),
+                           numpy.log(end), self._table())
+        finally:
+            numpy.seterr(**old)
+
+    def _table(self):
+        """Build a table from code points to the rows of emissions.
+        """
+        items = self._rows.items()
+        points = numpy.array([ord(char) for char, row in items],
+                             dtype=numpy.int64)
+        table = numpy.zeros(points.max() + 1 if items else 0,
+                            dtype=numpy.int64)
+        table[points] = [row for char, row in items]
+        return table
+
+    def _observe(self, sent, table):
+        """Turn a sentence into the rows of emissions.
+        """
+        points = numpy.frombuffer(sent.encode(POINT_CODING),
+                               dtype=POINT_DTYPE)
+        size = len(table)
+        if not size:
+            return numpy.zeros(len(points), dtype=numpy.int64)
+        res = table[numpy.minimum(points, size - 1)]
+        res[points >= size] = 0
+        return res
+
+    def _decode(self, batch):
+        """Decode a batch of sentences in a single Viterbi pass.
+
+        @return: a list of lists of tags, one for each sentence, padded
+        to the longest sentence
+        """
+        if self._model is None:
+            self._compile()
+        emit, trans, start, end, table = self._model
+        lengths = numpy.array([len(i) for i in batch])
+        obs = numpy.zeros((len(batch), lengths.max()), dtype=numpy.int64)
+        for i, sent in enumerate(batch):
+            obs[i, :len(sent)] = self._observe(sent, table)
+        path = viterbi(emit[obs], trans, lengths, start, end)
+        tags = self.tags
+        return [[tags[c] for c in codes] for codes in path.tolist()]
+
+    def __repr__(self):
+        return "<HMMTagger: %d characters, %d tags>" % \
+               (len(self._rows), len(self.tags))
+
+
+def demo():
+    """Demo for HMMTagger
+    """
+    words = [u"结合", u"成", u"分子", u"时", u"合成", u"分子", u"结合",
+             u"成分", u"子时", u"马勒戈壁", u"上", u"的", u"草泥马",
+             u"战胜", u"了", u"河蟹"] * 10
+    tagger = HMMTagger(BMESTagSet(), words)
+    print tagger
+    sent = u"结合成分子时"
+    print " ".join(["%s/%s" % i for i in tagger.tag(sent)])
+    print "/".join(tagger.seg(sent))
+    for words in tagger.seg_many([sent, u"马勒戈壁上的草泥马战胜了河蟹",
+                                  u"河蟹"]):
+        print "/".join(words)
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Word lattice of a sentence, shared by several decoders
+"""
+__all__ = ["Lattice"]
+
+from array import array
+
+class Lattice(object):
+    """All the dictionary words found in a sentence, found by probing
+    the dictionary once. Decoders like FMMSeg, BMMSeg, BiMMSeg and
+    MPSeg accept a lattice in place of their dictionary, so the
+    dictionary is probed once per sentence however many decoders run.
+
+    The words are stored like a sparse matrix in compressed rows: the
+    ends of the words starting at offset are
+    ends[index[offset]:index[offset + 1]], in increasing order, and
+    their values are at the same positions of values.
+
+    A lattice looks up words the same way as a trie does, with
+    longest_prefix(), prefixes(), prefix_items(), longest_suffix() and
+    suffixes(), but it only knows about its own sentence, which must be
+    passed as seq. prefix_items() needs a lattice built with values,
+    like the one of MPSeg.lattice().
+    """
+
+    def __init__(self, sent, trie, values=False, reverse=False):
+        """Find all the words of a sentence in a trie.
+
+        @type sent: unicode string
+        @param sent: the sentence
+        @type trie: Trie, or any trie with the same look-up methods
+        @param trie: the dictionary
+        @type values: bool
+        @param values: whether to keep the values of the words, found
+        by trie.prefix_items(), or looked up one by one for tries
+        without it, like FrozenTrie and OverlayTrie
+        @type reverse: bool
+        @param reverse: whether the trie holds reversed words, like the
+        trie of BMMSeg
+        """
+        size = len(sent)
+        self.sent = sent
+        index = array("i", [0])
+        ends = array("i")
+        vals = [] if values else None
+        # the start of the longest word ending at each position
+        longest = array("i", [-1]) * (size + 1)
+        if not reverse:
+            items = getattr(trie, "prefix_items", None)
+            for offset in xrange(size):
+                if values:
+                    if items is not None:
+                        pairs = items(sent, offset)
+                    else:
+                        pairs = [(idx, trie[sent[offset:idx]]) for idx in
+                                 trie.prefixes(sent, offset)]
+                    for idx, value in pairs:
+                        if idx > offset:
+                            ends.append(idx)
+                            vals.append(value)
+                            if longest[idx] < 0:
+                                longest[idx] = offset
+                else:
+                    for idx in trie.prefixes(sent, offset):
+                        if idx > offset:
+                            ends.append(idx)
+                            if longest[idx] < 0:
+                                longest[idx] = offset
+                index.append(len(ends))
+        else:
+            rows = [[] for i in xrange(size)]
+            for end in xrange(1, size + 1):
+                for idx in trie.suffixes(sent, end):
+                    if idx < end:
+                        rows[idx].append(end)
+                        longest[end] = idx
+            for row in rows:
+                row.sort()
+                ends.extend(row)
+                index.append(len(ends))
+            if values:
+                for offset in xrange(size):
+                    for i in xrange(index[offset], index[offset + 1]):
+                        vals.append(trie[sent[offset:ends[i]][::-1]])
+        self._index = index
+        self._ends = ends
+        self._values = vals
+        self._longest = longest
+        # the starts of the words ending at each position, built when
+        # needed
+        self._back = None
+
+    def _check(self, seq):
+        if seq is not self.sent and seq != self.sent:
+            raise ValueError("the lattice is of another sentence")
+
+    def longest_prefix(self, seq, offset=0):
+        """Find the longest word starting at offset.
+
+        @return: the index of the element next to the word, or None
+        """
+        self._check(seq)
+        if offset < len(self._index) - 1:
+            end = self._index[offset + 1]
+            if end > self._index[offset]:
+                return self._ends[end - 1]
+        return None
+
+    def prefixes(self, seq, offset=0):
+        """Find all the words starting at offset.
+
+        @return: an iterator over the index of the element next to each
+        word, shortest word first
+        """
+        self._check(seq)
+        if offset >= len(self._index) - 1:
+            return iter(())
+        return iter(self._ends[self._index[offset]:self._index[offset + 1]])
+
+    def prefix_items(self, seq, offset=0):
+        """Find all the words starting at offset, together with their
+        values.
+
+        @return: an iterator over (index, value) tuples, shortest word
+        first
+        @raise ValueError: if the lattice keeps no values
+        """
+        self._check(seq)
+        if self._values is None:
+            raise ValueError("the lattice keeps no values")
+        if offset >= len(self._index) - 1:
+            return iter(())
+        start = self._index[offset]
+        end = self._index[offset + 1]
+        return iter(zip(self._ends[start:end], self._values[start:end]))
+
+    def _build_back(self):
+        """Build a lattice of the starts of the words ending at each
+        position, in compressed rows like the lattice itself.
+        """
+        size = len(self._index) - 1
+        rows = [[] for i in xrange(size + 1)]
+        index = self._index
+        ends = self._ends
+        # offsets in decreasing order, so the shortest word comes first
+        for offset in xrange(size - 1, -1, -1):
+            for i in xrange(index[offset], index[offset + 1]):
+                rows[ends[i]].append(offset)
+        back_index = array("i", [0])
+        starts = array("i")
+        for row in rows:
+            starts.extend(row)
+            back_index.append(len(starts))
+        self._back = (back_index, starts)
+
+    def longest_suffix(self, seq, end):
+        """Find the longest word ending at end.
+
+        @return: the starting index of the word, or None
+        """
+        self._check(seq)
+        if 0 <= end < len(self._longest) and self._longest[end] >= 0:
+            return self._longest[end]
+        return None
+
+    def suffixes(self, seq, end):
+        """Find all the words ending at end.
+
+        @return: an iterator over the starting index of each word,
+        shortest word first
+        """
+        self._check(seq)
+        if self._back is None:
+            self._build_back()
+        index, starts = self._back
+        return iter(starts[index[end]:index[end + 1]])
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __repr__(self):
+        return "<Lattice: %d words>" % len(self)
+
+
+def demo():
+    """Demo for Lattice
+    """
+    from mm import FMMSeg, BMMSeg, BiMMSeg
+    from mp import MPSeg
+
+    freqs = [(u"结合", 50), (u"合成", 30), (u"成分", 2), (u"分子", 60),
+             (u"子时", 1), (u"结", 10), (u"合", 10), (u"成", 20),
+             (u"分", 20), (u"子", 10), (u"时", 30)]
+    words = [word for word, count in freqs]
+    mpseg = MPSeg()
+    mpseg.add_freqs(freqs)
+
+    sent = u"结合成分子时"
+    # probe the dictionary once, with counts for MPSeg
+    lattice = mpseg.lattice(sent)
+    print lattice
+    for offset in xrange(len(sent)):
+        print sent[offset], " ".join([sent[offset:end] for end, count in
+                                      lattice.prefix_items(sent, offset)])
+    for name, seg in [("FMM ", FMMSeg(train=words)),
+                      ("BMM ", BMMSeg(train=words)),
+                      ("BiMM", BiMMSeg(train=words)),
+                      ("MP  ", mpseg)]:
+        print name, "/".join(seg.seg(sent, lattice))
+
+
+if __name__ == "__main__":
+    demo()
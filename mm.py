@@ -9,14 +9,22 @@
 # For license information, see COPYING
 
 
-"""Forward and Backward Maximum Matching word segmentor. Mainly used
-as a baseline segmentor.
+"""Forward, Backward and Bidirectional Maximum Matching word
+segmentor. Mainly used as a baseline segmentor.
+
+The dictionary of a segmentor can be updated while other threads are
+segmenting with it: updates are made on a snapshot of the trie, which
+then replaces the trie in a single assignment, so seg() always sees
+either the old or the new dictionary as a whole. Updates themselves
+should be made from one thread at a time.
 """
-__all__ = ["FMMSeg", "BMMSeg"]
+__all__ = ["FMMSeg", "BMMSeg", "BiMMSeg"]
 
+from array import array
 from copy import deepcopy
 
-from pyci.trie import Trie
+from pyci.trie import Trie, OverlayTrie
+from pyci.lattice import Lattice
 
 class FMMSeg(object):
     """A forward maximum matching Chinese word segmentor.
@@ -27,83 +35,336 @@ class FMMSeg(object):
 
         @type train: an iterable of words
         @param train: training set
-        @type wordtrie: a trie of words
+        @type wordtrie: a trie of words, either a Trie or a FrozenTrie
         @param wordtrie: previously trained trie
 
-        If wordtrie is provided, it's deepcopied as the initial trie,
-        otherwise a new blank trie will be constructed.
+        If wordtrie is provided, a snapshot of it is taken as the
+        initial trie, tries without snapshots are deepcopied instead,
+        otherwise a new blank trie will be constructed. Read-only tries
+        like FrozenTrie and MappedTrie are shared instead of copied.
 
         If train is provided, it's appended into the trie above.
         """
-        if wordtrie:
+        if wordtrie and hasattr(wordtrie, "snapshot"):
+            self._trie = wordtrie.snapshot()
+        elif wordtrie:
             self._trie = deepcopy(wordtrie)
         else:
             self._trie = Trie()
+        self.generation = 0
+        # length of the longest word, which bounds how far an edit of
+        # the text can change the segmentation, None if unknown
+        self.context = None if wordtrie else 0
         if train:
             self.add_words(train)
 
+    def _keys(self, words):
+        """Turn words into keys in the trie.
+
+        @type words: an iterable of words
+        @param words: the words
+        @return: an iterable of keys
+        """
+        return words
+
+    def _new_trie(self):
+        """Get a trie with the same content as the current trie, which
+        can be modified and then swapped in.
+
+        @return: a snapshot of the trie, or an overlay on it if the
+        trie is read-only
+        """
+        if hasattr(self._trie, "snapshot"):
+            return self._trie.snapshot()
+        else:
+            return OverlayTrie(self._trie)
+
     def add_words(self, train):
         """Add train words into the trie.
 
         @type train: an iterable of words
         @param train: (possibly) new words
         """
-        for word in train:
-            self._trie[word] = word
+        trie = self._new_trie()
+        # only the presence of words matters, so don't keep another
+        # reference to each word
+        longest = 0
+        for word in self._keys(train):
+            trie[word] = True
+            longest = max(longest, len(word))
+        self._trie = trie
+        self.generation += 1
+        if self.context is not None:
+            self.context = max(self.context, longest)
+
+    def remove_words(self, words):
+        """Remove words from the trie, words not in the trie are
+        ignored.
+
+        @type words: an iterable of words
+        @param words: words to be removed
+        """
+        trie = self._new_trie()
+        for word in self._keys(words):
+            try:
+                del trie[word]
+            except KeyError:
+                pass
+        self._trie = trie
+        self.generation += 1
+
+    def set_user_words(self, added, removed=()):
+        """Replace the user dictionary. The user dictionary is a layer
+        on top of the trie, the words added or removed by the previous
+        call, or by add_words() and remove_words() since then, are
+        forgotten. This takes time proportional to the size of the
+        user dictionary only.
+
+        @type added: an iterable of words
+        @param added: words to be added
+        @type removed: an iterable of words
+        @param removed: words to be removed
+        """
+        base = self._trie
+        if isinstance(base, OverlayTrie):
+            base = base.base()
+        trie = OverlayTrie(base)
+        longest = 0
+        for word in self._keys(added):
+            trie[word] = True
+            longest = max(longest, len(word))
+        for word in self._keys(removed):
+            try:
+                del trie[word]
+            except KeyError:
+                pass
+        self._trie = trie
+        self.generation += 1
+        if self.context is not None:
+            self.context = max(self.context, longest)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # segmentors pickled before caches and sessions have neither
+        self.__dict__.setdefault("generation", 0)
+        self.__dict__.setdefault("context", None)
+
+    def lattice(self, sent, values=False):
+        """Find all the words of a sentence in the trie, so several
+        decoders can share them.
+
+        @type sent: unicode string
+        @param sent: the sentence
+        @type values: bool
+        @param values: whether to keep the values of the words
 
-    def seg(self, sent):
+        @return: a Lattice of sent
+        """
+        return Lattice(sent, self._trie, values)
+
+    def seg(self, sent, lattice=None):
         """Segment a sentence.
 
         @type sent: unicode string
         @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, if provided, the trie is not
+        probed
 
         @return: a list of segmented words
         """
-        words = []
+        cuts = self.seg_spans(sent, lattice)
+        return [sent[cuts[i - 1]:cuts[i]] for i in xrange(1, len(cuts))]
+
+    def seg_spans(self, sent, lattice=None):
+        """Segment a sentence into spans, without building the words.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, if provided, the trie is not
+        probed
+
+        @return: an array of the boundaries of words, starting with 0
+        and ending with len(sent), i.e. the i-th word is
+        sent[cuts[i]:cuts[i + 1]]
+        """
+        # stick to one trie even if it is replaced meanwhile
+        trie = self._trie if lattice is None else lattice
+        cuts = array("i", [0])
         offset = 0
-        idx = self._trie.longest_prefix(sent, offset)
-        while offset < len(sent):
+        size = len(sent)
+        while offset < size:
+            idx = trie.longest_prefix(sent, offset)
             if idx is None:
                 # the first character is not found in our trie, so
                 # treat it as a whole word
                 idx = offset + 1
-            words.append(sent[offset:idx])
+            cuts.append(idx)
             offset = idx
-            idx = self._trie.longest_prefix(sent, offset)
-        return words
+        return cuts
 
 
 class BMMSeg(FMMSeg):
-    """A backward maximum matching Chinese word segmentor.
+    """A backward maximum matching Chinese word segmentor. The trie
+    holds reversed words and is walked backwards over the sentence,
+    so the sentence itself is never reversed.
     """
 
-    def add_words(self, train):
-        """Add train words into the trie.
+    def _keys(self, words):
+        """Turn words into keys in the trie.
 
-        @type train: an iterable of words
-        @param train: (possibly) new words
+        @type words: an iterable of words
+        @param words: the words
+        @return: an iterable of keys
         """
-        # just reverse everything
-        train = [i[::-1] for i in train]
-        FMMSeg.add_words(self, train)
+        # words are matched from their ends, so the trie is keyed by
+        # reversed words
+        return [i[::-1] for i in words]
 
+    def lattice(self, sent, values=False):
+        """Find all the words of a sentence in the trie, see
+        FMMSeg.lattice().
+        """
+        return Lattice(sent, self._trie, values, reverse=True)
 
-    def seg(self, sent):
-        """Segment a sentence.
+    def seg_spans(self, sent, lattice=None):
+        """Segment a sentence into spans, without building the words.
 
         @type sent: unicode string
         @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, if provided, the trie is not
+        probed
 
-        @return: a list of segmented words
+        @return: an array of the boundaries of words, see
+        FMMSeg.seg_spans()
         """
-        sent = sent[::-1]
-        words = FMMSeg.seg(self, sent)
-        words.reverse()
-        return [i[::-1] for i in words]
+        # stick to one trie even if it is replaced meanwhile
+        trie = self._trie if lattice is None else lattice
+        cuts = array("i", [len(sent)])
+        end = len(sent)
+        while end > 0:
+            idx = trie.longest_suffix(sent, end)
+            if idx is None:
+                # the last character is not found in our trie, so
+                # treat it as a whole word
+                idx = end - 1
+            cuts.append(idx)
+            end = idx
+        cuts.reverse()
+        return cuts
+
+
+class BiMMSeg(FMMSeg):
+    """A bidirectional maximum matching Chinese word segmentor. Both the
+    forward and the backward maximum matches are found in the lattice
+    of the sentence, built with one trie of words, then the
+    segmentation with fewer words is taken, or the one with fewer
+    single character words if they have as many words, or the backward
+    one if still tied.
+
+    Where the two segmentations disagree, the sentence is ambiguous,
+    see disagreements().
+    """
+
+    def __init__(self, wordtrie=None, train=None):
+        """Construct a BiMM Chinese word segmentor, see FMMSeg.
+        """
+        FMMSeg.__init__(self, wordtrie, train)
+        # the choice between the two segmentations depends on the
+        # whole sentence, so no edit has a bounded effect, and
+        # SegSession and seg_document() must not cut the text
+        self.context = None
+
+    def _match(self, sent, lattice=None):
+        """Find the forward and the backward maximum matching.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, built from the trie if not
+        provided
+
+        @return: a tuple of two lists, the cut points of the forward
+        and of the backward segmentation, both including 0 and
+        len(sent)
+        """
+        if lattice is None:
+            lattice = self.lattice(sent)
+        size = len(sent)
+        fcuts = [0]
+        offset = 0
+        while offset < size:
+            idx = lattice.longest_prefix(sent, offset)
+            offset = offset + 1 if idx is None else idx
+            fcuts.append(offset)
+        bcuts = [size]
+        end = size
+        while end > 0:
+            idx = lattice.longest_suffix(sent, end)
+            end = end - 1 if idx is None else idx
+            bcuts.append(end)
+        bcuts.reverse()
+        return fcuts, bcuts
+
+    def seg_spans(self, sent, lattice=None):
+        """Segment a sentence into spans, without building the words.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, if provided, the trie is not
+        probed
+
+        @return: an array of the boundaries of words, see
+        FMMSeg.seg_spans()
+        """
+        fcuts, bcuts = self._match(sent, lattice)
+        if len(fcuts) < len(bcuts):
+            cuts = fcuts
+        elif len(fcuts) > len(bcuts):
+            cuts = bcuts
+        else:
+            fsingle = sum(1 for i in xrange(1, len(fcuts))
+                          if fcuts[i] - fcuts[i - 1] == 1)
+            bsingle = sum(1 for i in xrange(1, len(bcuts))
+                          if bcuts[i] - bcuts[i - 1] == 1)
+            cuts = fcuts if fsingle < bsingle else bcuts
+        return array("i", cuts)
+
+    def disagreements(self, sent, lattice=None):
+        """Find where the forward and the backward maximum matching
+        disagree.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent, if provided, the trie is not
+        probed
+
+        @return: a list of (start, end) tuples, each is a span of sent
+        segmented differently by the two, bounded by cut points common
+        to both
+        """
+        fcuts, bcuts = self._match(sent, lattice)
+        common = set(fcuts).intersection(bcuts)
+        spans = []
+        start = 0
+        differ = False
+        for idx in sorted(common.union(fcuts, bcuts)):
+            if idx in common:
+                if differ:
+                    spans.append((start, idx))
+                start = idx
+                differ = False
+            else:
+                differ = True
+        return spans
 
 
 def demo():
-    """Demo for FMM and BMM segmentors
+    """Demo for FMM, BMM and BiMM segmentors
     """
     words = [u"戈壁", u"战胜", u"结合", u"合成", u"分子", u"子时", u"壁上的"]
     fseg = FMMSeg(train=words)
@@ -129,6 +390,16 @@ def demo():
     print "BMM",
     print "/".join(bseg.seg(sent))
 
+    print "Hot reload a user dictionary"
+    fseg.set_user_words([u"草泥"], [u"草泥马"])
+    bseg.set_user_words([u"草泥"], [u"草泥马"])
+
+    print "FMM",
+    print "/".join(fseg.seg(sent))
+
+    print "BMM",
+    print "/".join(bseg.seg(sent))
+
     print "\nAmbiguity"
     sent1 = u"结合成分子时"
 
@@ -138,6 +409,12 @@ def demo():
     print "BMM",
     print "/".join(bseg.seg(sent1))
 
+    print "BiMM",
+    biseg = BiMMSeg(train=words)
+    print "/".join(biseg.seg(sent1)),
+    print " ".join(sent1[start:end]
+                   for start, end in biseg.disagreements(sent1))
+
 
 if __name__ == "__main__":
     demo()
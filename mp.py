@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Maximum Probability word segmentor, based on word unigram
+frequencies.
+
+Like the maximum matching segmentors, the dictionary can be updated
+while other threads are segmenting with it.
+"""
+__all__ = ["MPSeg"]
+
+from array import array
+from collections import defaultdict
+from math import log
+
+from pyci.trie import Trie
+from pyci.lattice import Lattice
+
+class MPSeg(object):
+    """A maximum probability Chinese word segmentor. Every word found in
+    the sentence is an edge of a directed acyclic graph over the
+    positions of the sentence, weighted by the log probability of the
+    word, and the segmentation is the path with the greatest sum of
+    weights, i.e. the most probable sequence of words under a unigram
+    word model.
+
+    Characters not starting any known word are words on their own,
+    with the probability of a word seen once.
+    """
+
+    def __init__(self, train=None):
+        """Construct a MP Chinese word segmentor.
+
+        @type train: an iterable of words
+        @param train: training set, each occurrence of a word counts
+        """
+        # the trie maps words to their counts, it's replaced together
+        # with the total count in a single assignment
+        self._model = (Trie(), 0)
+        self.generation = 0
+        if train:
+            self.add_words(train)
+
+    def add_words(self, train):
+        """Count words into the model.
+
+        @type train: an iterable of words
+        @param train: training set, each occurrence of a word counts
+        """
+        counts = defaultdict(int)
+        for word in train:
+            counts[word] += 1
+        self.add_freqs(counts.iteritems())
+
+    def add_freqs(self, freqs):
+        """Add words with their counts into the model, e.g. from a
+        frequency dictionary.
+
+        @type freqs: an iterable of (word, count) tuples
+        @param freqs: words and their counts
+        """
+        trie, total = self._model
+        trie = trie.snapshot()
+        for word, count in freqs:
+            if not word or count <= 0:
+                continue
+            try:
+                trie[word] += count
+            except KeyError:
+                trie[word] = count
+            total += count
+        self._model = (trie, total)
+        self.generation += 1
+
+    def load_corpus(self, reader):
+        """Count the words of a corpus into the model.
+
+        @type reader: BaseCorpusReader
+        @param reader: the corpus reader, e.g. Bakeoff2005TrainReader
+        """
+        self.add_words(reader.words())
+
+    def lattice(self, sent):
+        """Find all the words of a sentence with their counts, so
+        several decoders can share them.
+
+        @type sent: unicode string
+        @param sent: the sentence
+
+        @return: a Lattice of sent
+        """
+        return Lattice(sent, self._model[0], values=True)
+
+    def seg(self, sent, lattice=None):
+        """Segment a sentence.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent with their counts, if
+        provided, the trie is not probed
+
+        @return: a list of segmented words
+        """
+        cuts = self.seg_spans(sent, lattice)
+        return [sent[cuts[i - 1]:cuts[i]] for i in xrange(1, len(cuts))]
+
+    def seg_spans(self, sent, lattice=None):
+        """Segment a sentence into spans, without building the words.
+
+        @type sent: unicode string
+        @param sent: the sentence to be segmented
+        @type lattice: Lattice
+        @param lattice: the words of sent with their counts, if
+        provided, the trie is not probed
+
+        @return: an array of the boundaries of words, starting with 0
+        and ending with len(sent), i.e. the i-th word is
+        sent[cuts[i]:cuts[i + 1]]
+        """
+        # stick to one model even if it is replaced meanwhile
+        trie, total = self._model
+        if lattice is not None:
+            trie = lattice
+        log_total = log(max(total, 1))
+        size = len(sent)
+        # best[i] is the greatest log probability of sent[i:], and
+        # route[i] is where the first word on that path ends
+        best = [0.0] * (size + 1)
+        route = range(1, size + 2)
+        for offset in xrange(size - 1, -1, -1):
+            score = best[offset + 1] - log_total
+            end = offset + 1
+            for idx, count in trie.prefix_items(sent, offset):
+                if idx == offset:
+                    continue
+                s = log(count) - log_total + best[idx]
+                if s > score:
+                    score = s
+                    end = idx
+            best[offset] = score
+            route[offset] = end
+        cuts = array("i", [0])
+        offset = 0
+        while offset < size:
+            offset = route[offset]
+            cuts.append(offset)
+        return cuts
+
+
+def demo():
+    """Demo for MP segmentor
+    """
+    from mm import FMMSeg, BMMSeg
+
+    freqs = [(u"结合", 50), (u"合成", 30), (u"成分", 2), (u"分子", 60),
+             (u"子时", 1), (u"结", 10), (u"合", 10), (u"成", 20),
+             (u"分", 20), (u"子", 10), (u"时", 30)]
+    mpseg = MPSeg()
+    mpseg.add_freqs(freqs)
+    words = [word for word, count in freqs]
+    fseg = FMMSeg(train=words)
+    bseg = BMMSeg(train=words)
+
+    sent = u"结合成分子时"
+    print "FMM", "/".join(fseg.seg(sent))
+    print "BMM", "/".join(bseg.seg(sent))
+    print "MP ", "/".join(mpseg.seg(sent))
+
+
+if __name__ == "__main__":
+    demo()
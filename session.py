@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Incremental segmentation of a text being edited
+"""
+__all__ = ["SegSession"]
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+def _index(cuts, cut):
+    """Find a cut point in a sorted list of cut points.
+
+    @return: the index of cut, or None if it's not a cut point
+    """
+    idx = bisect_left(cuts, cut)
+    if idx < len(cuts) and cuts[idx] == cut:
+        return idx
+    return None
+
+class SegSession(object):
+    """A segmented text which can be edited. After an edit, only a
+    window around it is segmented again.
+
+    The window starts and ends at cut points of the old segmentation,
+    at least context characters away from the edit. The new
+    segmentation of the window is spliced in at cut points it shares
+    with the old segmentation, again at least context characters from
+    the window's ends, so that the words on both sides of a splice
+    are not affected by where the window was cut. If there are no such
+    cut points, the window is widened until there are.
+
+    For FMMSeg and BMMSeg, whose context is the length of the longest
+    word, the result is the same as segmenting the whole text again.
+    BiMMSeg and MPSeg choose their segmentation over the whole text,
+    and have no context.
+    For TagSeg over a tagger which tags each character by the
+    characters around it, the context is how far it looks, e.g. 0 for
+    UnigramTagger. Viterbi taggers like HMMTagger, CRFTextTagger and
+    CRFTagger find the best tags of the whole sentence, so they are
+    rejected, even with a context.
+    """
+
+    def __init__(self, segmentor, text, context=None):
+        """Segment a text.
+
+        @type segmentor: any object with a seg_spans(sent) method
+        @param segmentor: the segmentor to be used
+        @type text: unicode string
+        @param text: the text
+        @type context: non-negative integer
+        @param context: how far a change of the text can affect the
+        segmentation, default to segmentor.context, e.g. the length of
+        the longest word of FMMSeg
+
+        @raise ValueError: if the context is unknown, or the segmentor
+        decodes whole sentences
+        """
+        # a TagSeg, or a tagger itself
+        tagger = getattr(segmentor, "tagger", None)
+        owner = getattr(tagger, "__self__", segmentor)
+        if getattr(owner, "whole_sentence", False):
+            raise ValueError("%r decodes whole sentences" % segmentor)
+        if context is None:
+            context = getattr(segmentor, "context", None)
+        if context is None:
+            raise ValueError("context of %r is unknown" % segmentor)
+        self._segmentor = segmentor
+        self._context = context
+        self.text = text
+        self._cuts = list(segmentor.seg_spans(text))
+
+    def edit(self, start, end, new):
+        """Replace text[start:end] with new, and segment again.
+
+        @type start: non-negative integer
+        @param start: the starting index of the replaced text
+        @type end: non-negative integer
+        @param end: the index next to the replaced text
+        @type new: unicode string
+        @param new: the new text, empty for deletions
+
+        @return: a tuple of the starting and ending index of the
+        segmented window in the new text
+        """
+        text = self.text
+        cuts = self._cuts
+        size = len(text)
+        if not 0 <= start <= end <= size:
+            raise IndexError("edit out of range")
+        context = self._context
+        delta = len(new) - (end - start)
+        text = text[:start] + new + text[end:]
+        new_end = start + len(new)
+        left = right = max(context, 1)
+        while True:
+            a = cuts[bisect_right(cuts, max(start - left, 0)) - 1]
+            b = cuts[bisect_left(cuts, min(end + right, size))] + delta
+            window = [a + i for i in self._segmentor.seg_spans(text[a:b])]
+            # the last cut point before the edit shared with the old
+            # segmentation
+            lsync = 0 if a == 0 else None
+            for k in xrange(len(window) - 1, 0, -1):
+                if lsync is not None or window[k] < a + context:
+                    break
+                if window[k] <= start and _index(cuts, window[k]) is not None:
+                    lsync = k
+            if lsync is None:
+                left *= 2
+                continue
+            # the first one after the edit
+            rsync = len(window) - 1 if b == len(text) else None
+            for k in xrange(len(window)):
+                if rsync is not None or window[k] > b - context:
+                    break
+                if (window[k] >= new_end and
+                    _index(cuts, window[k] - delta) is not None):
+                    rsync = k
+            if rsync is None:
+                right *= 2
+                continue
+            break
+        head = _index(cuts, window[lsync])
+        tail = _index(cuts, window[rsync] - delta)
+        self._cuts = cuts[:head] + window[lsync:rsync + 1] + \
+                     [i + delta for i in cuts[tail + 1:]]
+        self.text = text
+        return window[lsync], window[rsync]
+
+    def spans(self):
+        """Get the segmentation of the text.
+
+        @return: an array of the boundaries of words, see
+        FMMSeg.seg_spans()
+        """
+        return array("i", self._cuts)
+
+    def words(self):
+        """Get the segmentation of the text.
+
+        @return: a list of segmented words
+        """
+        text = self.text
+        cuts = self._cuts
+        return [text[cuts[i - 1]:cuts[i]] for i in xrange(1, len(cuts))]
+
+
+def demo():
+    """Demo for SegSession
+    """
+    from mm import FMMSeg
+
+    seg = FMMSeg(train=[u"结合", u"合成", u"分子", u"子时", u"马勒戈壁",
+                        u"草泥马", u"河蟹", u"战胜"])
+    session = SegSession(seg, u"马勒戈壁上的草泥马战胜了河蟹。结合成分子时")
+    print "/".join(session.words())
+    print session.edit(9, 11, u"打败"), "/".join(session.words())
+    print session.edit(15, 15, u"它们"), "/".join(session.words())
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# PyCi
+#
+# Copyright (c) 2009, The PyCi Project
+# Authors: Wu Ke <ngu.kho@gmail.com>
+#          Chen Xing <cxcxcxcx@gmail.com>
+# URL: <http://code.google.com/p/pyci>
+# For license information, see COPYING
+
+
+"""Segment text streams of any size in bounded memory
+"""
+__all__ = ["cut", "seg_stream", "write_stream"]
+
+import codecs
+import re
+
+# no word spans these, so it's safe to cut after them
+PUNCTUATION = u"，。！？；：、…,!?;:"
+LINE_BREAKS = u"\r\n"
+
+def _read(source, coding, block_size):
+    """Read unicode text from a file object or an iterable of strings.
+    """
+    if hasattr(source, "read"):
+        texts = iter(lambda: source.read(block_size), "")
+    else:
+        texts = source
+    decoder = codecs.getincrementaldecoder(coding)()
+    for text in texts:
+        if not text:
+            continue
+        if not isinstance(text, unicode):
+            # multibyte characters may be split between blocks
+            text = decoder.decode(text)
+        yield text
+    text = decoder.decode("", True)
+    if text:
+        yield text
+
+def cut(source, max_span=1024, punctuation=PUNCTUATION, coding="utf-8",
+        block_size=65536):
+    """Cut text read from source into pieces at safe boundaries: after
+    punctuation, at line breaks, or every max_span characters if there
+    are no such boundaries. Only a block and a piece are held in
+    memory at any time.
+
+    @type source: file object or iterable of strings
+    @param source: where the text is read from, either unicode or
+    encoded strings
+    @type max_span: positive integer
+    @param max_span: the maximum length of a piece
+    @type punctuation: unicode string
+    @param punctuation: characters after which it's safe to cut
+    @type coding: string
+    @param coding: the encoding of encoded strings
+    @type block_size: positive integer
+    @param block_size: how many bytes are read from a file at a time
+
+    @return: a generator iterates over the pieces, each line break is
+    a piece on its own
+    """
+    pattern = re.compile(u"[%s]|[%s]" % (re.escape(punctuation),
+                                         re.escape(LINE_BREAKS)))
+    rest = u""
+    for text in _read(source, coding, block_size):
+        text = rest + text
+        start = 0
+        for match in pattern.finditer(text):
+            idx = match.start()
+            if text[idx] in LINE_BREAKS:
+                end = idx
+            else:
+                end = idx + 1
+            while end - start > max_span:
+                yield text[start:start + max_span]
+                start += max_span
+            if end > start:
+                yield text[start:end]
+            if end == idx:
+                yield text[idx]
+            start = idx + 1
+        while len(text) - start >= max_span:
+            yield text[start:start + max_span]
+            start += max_span
+        rest = text[start:]
+    if rest:
+        yield rest
+
+def seg_stream(segmentor, source, **kwargs):
+    """Segment text read from source piece by piece, see cut().
+
+    @type segmentor: any object with a seg(sent) method
+    @param segmentor: the segmentor to be used
+    @type source: file object or iterable of strings
+    @param source: where the text is read from
+    @param kwargs: passed to cut()
+
+    @return: a generator iterates over the segmented words, line
+    breaks are not segmented but are yielded as they are
+    """
+    for piece in cut(source, **kwargs):
+        if piece in LINE_BREAKS:
+            yield piece
+        else:
+            for word in segmentor.seg(piece):
+                yield word
+
+def write_stream(segmentor, source, out, sep=u" ", coding="utf-8",
+                 **kwargs):
+    """Segment text read from source and write the words into out as
+    soon as they are segmented.
+
+    @type segmentor: any object with a seg(sent) method
+    @param segmentor: the segmentor to be used
+    @type source: file object or iterable of strings
+    @param source: where the text is read from
+    @type out: file object
+    @param out: where the words are written
+    @type sep: unicode string
+    @param sep: separator written between words in a line
+    @type coding: string
+    @param coding: the encoding of both source and out
+    @param kwargs: passed to cut()
+    """
+    first = True
+    for word in seg_stream(segmentor, source, coding=coding, **kwargs):
+        if word in LINE_BREAKS:
+            out.write(word.encode(coding))
+            first = True
+        else:
+            if not first:
+                out.write(sep.encode(coding))
+            out.write(word.encode(coding))
+            first = False
+
+
+def demo():
+    """Demo for streaming segmentation
+    """
+    import sys
+    from StringIO import StringIO
+    from mm import FMMSeg
+
+    words = [u"结合", u"合成", u"分子", u"子时", u"马勒戈壁", u"草泥马",
+             u"河蟹", u"战胜"]
+    seg = FMMSeg(train=words)
+    text = u"马勒戈壁上的草泥马战胜了河蟹。\n结合成分子时，\n"
+    source = StringIO(text.encode("utf-8"))
+    # a tiny block size splits characters between blocks
+    write_stream(seg, source, sys.stdout, sep=u"/", block_size=5)
+
+
+if __name__ == "__main__":
+    demo()
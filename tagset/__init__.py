@@ -14,7 +14,7 @@
 Contains several tag set used for tagging segmentation like CRF.
 """
 
-from api import TagError, TagSet, TagSeg
+from api import TagError, TagSet, TagSeg, BatchTagger
 from template import *
 
 
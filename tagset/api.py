@@ -11,7 +11,9 @@
 
 """TagSet interface
 """
-__all__ = ["TagError", "TagSet", "TagSeg"]
+__all__ = ["TagError", "TagSet", "TagSeg", "BatchTagger"]
+
+from array import array
 
 class TagError(Exception):
     pass
@@ -78,18 +80,139 @@ class TagSet(object):
         if word:
             yield word
 
+    def untag_spans(self, tagged_sent, strict=True, verbose=False):
+        """Untag a sentence into spans, without building the words.
+
+        @type tagged_sent: a list of (character, tag) tuples
+        @param tagged_sent: the sentence to be untagged
+        @type strict: bool
+        @param strict: see untag()
+        @return: an array of the boundaries of words, starting with 0
+        and ending with the length of the sentence, i.e. the i-th word
+        is sent[cuts[i]:cuts[i + 1]]
+        """
+        itags = self.itags
+        otags = self.otags
+        cuts = array("i", [0])
+        append = cuts.append
+        # the last boundary
+        last = 0
+        idx = 0
+        for char, tag in tagged_sent:
+            if verbose:
+                print char, tag
+            if tag in itags:
+                if idx > last:
+                    append(idx)
+                    last = idx
+            elif tag not in otags:
+                if strict:
+                    raise TagError()
+                if idx > last:
+                    append(idx)
+                last = idx + 1
+                append(last)
+            idx += 1
+        if idx > last:
+            append(idx)
+        return cuts
+
 
 class TagSeg(object):
     """Take a tagger and a tagset, construct a segmentor
+
+    If the tagger is a bound method, e.g. HMMTagger().tag, the
+    generation of its object is the generation of the segmentor.
     """
 
     def __init__(self, tagset, tagger):
         self.tagset = tagset
         self.tagger = tagger
 
+    def _generation(self):
+        # the generation of the tagger a bound tag() method belongs to
+        owner = getattr(self.tagger, "__self__", self.tagger)
+        return getattr(owner, "generation", 0)
+
+    # read by CachedSeg, to tell when the tagger has been retrained
+    generation = property(_generation)
+
     def seg(self, sent, verbose=False):
         return [i for i in self.tagset.untag(self.tagger(sent), False, verbose)]
 
+    def seg_spans(self, sent, verbose=False):
+        """Segment a sentence into spans, without building the words.
+
+        @return: an array of the boundaries of words, see
+        TagSet.untag_spans()
+        """
+        return self.tagset.untag_spans(self.tagger(sent), False, verbose)
+
+class BatchTagger(object):
+    """Base of taggers decoding many sentences at a time, like
+    HMMTagger and CRFTextTagger.
+
+    Subclasses set seg_o to a TagSeg of their tag() method, and
+    implement _decode(batch), which decodes a list of non-empty
+    sentences of about the same length, and returns a list of tag
+    sequences, at least as long as each sentence.
+    """
+
+    # the best tags of a sentence are found over the whole of it, so
+    # an edit may change tags anywhere, see SegSession
+    whole_sentence = True
+
+    def _decode(self, batch):
+        raise NotImplementedError
+
+    def tag_many(self, sents, batch_size=256):
+        """Tag many raw sentences at a time.
+
+        Sentences are sorted by length and decoded batch_size at a
+        time, so that little time is spent on padding.
+
+        @type sents: list of unicode strings
+        @param sents: the sentences to be tagged
+        @type batch_size: positive integer
+        @param batch_size: how many sentences are decoded at a time
+        @return: a list of lists of (char, tag) tuples
+        """
+        res = [[] for i in sents]
+        order = sorted([i for i in xrange(len(sents)) if sents[i]],
+                       key=lambda i: len(sents[i]))
+        for first in xrange(0, len(order), batch_size):
+            batch = order[first:first + batch_size]
+            tags = self._decode([sents[i] for i in batch])
+            for i, seq in zip(batch, tags):
+                sent = sents[i]
+                res[i] = zip(sent, seq[:len(sent)])
+        return res
+
+    def tag(self, sent):
+        """Tag raw sent into (char, tag) tuple"""
+        return iter(self.tag_many([sent])[0])
+
+    def seg(self, sent, verbose=False):
+        """Segment a string and return a list of words
+        """
+        return self.seg_o.seg(sent, verbose=verbose)
+
+    def seg_spans(self, sent, verbose=False):
+        """Segment a string and return an array of the boundaries of
+        words, see TagSeg.seg_spans()
+        """
+        return self.seg_o.seg_spans(sent, verbose=verbose)
+
+    def seg_many(self, sents, batch_size=256):
+        """Segment many strings, decoding them in batches, see
+        tag_many().
+
+        @return: a list of lists of segmented words
+        """
+        untag = self.seg_o.tagset.untag
+        return [list(untag(tagged, False))
+                for tagged in self.tag_many(sents, batch_size)]
+
 def demo():
     print ":::DEMO for tagset/api.py:::"
 
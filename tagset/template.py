@@ -13,22 +13,59 @@
 """
 __all__ = ["BETagSet", "BESTagSet", "BMESTagSet", "B123MESTagSet"]
 
+from array import array
+
 from api import *
 
+# taggers are module level functions, so the tag sets can be pickled
+
+def _be_tagger(word):
+    res = []
+    if word:
+        res.append((word[0], 'B'))
+    for i in word[1:]:
+        res.append((i, 'E'))
+    return res
+
+def _bes_tagger(word):
+    if len(word) == 1:
+        return [(word, 'S')]
+    elif len(word) > 1:
+        return [(word[0], 'B')] + [(i, 'E') for i in word[1:]]
+    else:
+        return []
+
+def _bmes_tagger(word):
+    if len(word) == 1:
+        return [(word, 'S')]
+    elif len(word) > 1:
+        return [(word[0], 'B')] + [(i, 'M') for i in word[1:-1]] + [(word[-1], 'E')]
+    else:
+        return []
+
+def _b123mes_tagger(word):
+    if len(word) == 1:
+        return [(word, 'S')]
+    elif len(word) > 1:
+        res = [(word[0], 'B')]
+        if len(word) == 2:
+            res.append( (word[1], 'E') )
+        elif len(word) == 3:
+            res.extend([ (word[1], 'B1'), (word[2], 'E') ])
+        else:
+            res.extend([ (word[1], 'B1'), (word[2], 'B2')] + \
+                    [(i, 'M') for i in word[3:-1]] + [ (word[-1], 'E') ])
+        return res
+    else:
+        return []
+
+
 class BETagSet(TagSet):
     """A tag set distinguishes only whether the character is the head of the word.
     """
 
     def __init__(self):
-        def tagger(word):
-            res = []
-            if word:
-                res.append((word[0], 'B'))
-            for i in word[1:]:
-                res.append((i, 'E'))
-            return res
-
-        TagSet.__init__(self, ['B'], ['E'], tagger)
+        TagSet.__init__(self, ['B'], ['E'], _be_tagger)
 
 
 class BESTagSet(TagSet):
@@ -36,15 +73,7 @@ class BESTagSet(TagSet):
     """
 
     def __init__(self):
-        def tagger(word):
-            if len(word) == 1:
-                return [(word, 'S')]
-            elif len(word) > 1:
-                return [(word[0], 'B')] + [(i, 'E') for i in word[1:]]
-            else:
-                return []
-
-        TagSet.__init__(self, ['B', 'S'], ['E'], tagger)
+        TagSet.__init__(self, ['B', 'S'], ['E'], _bes_tagger)
 
 
 class BMESTagSet(TagSet):
@@ -52,15 +81,7 @@ class BMESTagSet(TagSet):
     """
 
     def __init__(self):
-        def tagger(word):
-            if len(word) == 1:
-                return [(word, 'S')]
-            elif len(word) > 1:
-                return [(word[0], 'B')] + [(i, 'M') for i in word[1:-1]] + [(word[-1], 'E')]
-            else:
-                return []
-
-        TagSet.__init__(self, ['B', 'S'], ['M','E'], tagger)
+        TagSet.__init__(self, ['B', 'S'], ['M','E'], _bmes_tagger)
 
     def untag(self, tagged_sent, strict=True, verbose=False):
         """Untag a sentence into a list of words.
@@ -98,29 +119,52 @@ class BMESTagSet(TagSet):
         if word:
             yield word
 
+    def untag_spans(self, tagged_sent, strict=True, verbose=False):
+        """Untag a sentence into spans, without building the words.
+
+        @type tagged_sent: a list of (character, tag) tuples
+        @param tagged_sent: the sentence to be untagged
+        @type strict: bool
+        @param strict: see TagSet.untag()
+        @return: an array of the boundaries of words, see
+        TagSet.untag_spans()
+        """
+        itags = self.itags
+        otags = self.otags
+        cuts = array("i", [0])
+        append = cuts.append
+        # the last boundary
+        last = 0
+        idx = 0
+        for char, tag in tagged_sent:
+            if verbose:
+                print char, tag
+            if tag in itags:
+                if idx > last:
+                    append(idx)
+                    last = idx
+            elif tag == 'E':
+                last = idx + 1
+                append(last)
+            elif tag not in otags:
+                if strict:
+                    raise TagError()
+                if idx > last:
+                    append(idx)
+                last = idx + 1
+                append(last)
+            idx += 1
+        if idx > last:
+            append(idx)
+        return cuts
+
 
 class B123MESTagSet(TagSet):
     """Begin{1,2,3} Middle End Single
     """
 
     def __init__(self):
-        def tagger(word):
-            if len(word) == 1:
-                return [(word, 'S')]
-            elif len(word) > 1:
-                res = [(word[0], 'B')]
-                if len(word) == 2:
-                    res.append( (word[1], 'E') )
-                elif len(word) == 3:
-                    res.extend([ (word[1], 'B1'), (word[2], 'E') ])
-                else:
-                    res.extend([ (word[1], 'B1'), (word[2], 'B2')] + \
-                            [(i, 'M') for i in word[3:-1]] + [ (word[-1], 'E') ])
-                return res
-            else:
-                return []
-
-        TagSet.__init__(self, ['B', 'S'], ['B1', 'B2', 'M','E'], tagger)
+        TagSet.__init__(self, ['B', 'S'], ['B1', 'B2', 'M','E'], _b123mes_tagger)
 
 
 def demo():
@@ -12,9 +12,16 @@
 """Trie data structure for fast dictionary look-up
 """
 
+from heapq import heappush, heappop
+
 class Trie(object):
     """Trie is a data structure ideal for fast dictionary look-up.
     For details, see http://en.wikipedia.org/wiki/Trie
+
+    Snapshots of a trie share all the nodes with it. Every node is
+    owned by the trie which created it, a trie modifies the nodes it
+    owns in place, and copies the others on the way down before
+    modifying them.
     """
 
     def __init__(self, keys=None, value=lambda x:0):
@@ -26,6 +33,9 @@ class Trie(object):
         @param value: method to get values from keys, default sets
         everything to 0
         """
+        # the owner of the nodes this trie may modify in place, None
+        # until the trie is ever snapshotted
+        self._owner = None
         self._trie_root = TrieNode(None)
         if keys:
             for i in keys:
@@ -35,7 +45,72 @@ class Trie(object):
         return self._trie_root.lookup(key, 0)
 
     def __setitem__(self, key, value):
-        return self._trie_root.insert(key, 0, value)
+        if self._trie_root._owner is not self._owner:
+            self._trie_root = self._trie_root.copy(self._owner)
+        return self._trie_root.insert(key, 0, value, self._owner)
+
+    def __delitem__(self, key):
+        self._trie_root.lookup(key, 0)
+        if self._trie_root._owner is not self._owner:
+            self._trie_root = self._trie_root.copy(self._owner)
+        self._trie_root.remove(key, 0, self._owner)
+
+    def complete(self, prefix, k=10):
+        """Find the keys starting with prefix which have the k highest
+        values. Every node knows the highest value under it, so the
+        search goes best first and skips the subtrees which can not
+        make it into the top k.
+
+        Keys should be strings and values numbers.
+
+        @type prefix: string
+        @param prefix: the prefix to be completed
+        @type k: positive integer
+        @param k: how many keys to find
+
+        @return: a list of at most k (key, value) tuples, highest
+        value first
+        """
+        node = self._trie_root
+        for element in prefix:
+            node = node._child.get(element)
+            if node is None:
+                return []
+        res = []
+        if node._best is None:
+            return res
+        # entries are (-value, order, key, node), node is None for a
+        # key with exactly that value, otherwise value is the bound
+        # for the keys under node
+        order = 0
+        heap = [(-node._best, order, prefix, node)]
+        while heap and len(res) < k:
+            value, i, key, node = heappop(heap)
+            if node is None:
+                res.append((key, -value))
+                continue
+            if node._value is not None:
+                order += 1
+                heappush(heap, (-node._value, order, key, None))
+            for label, child in node._child.iteritems():
+                if child._best is not None:
+                    order += 1
+                    heappush(heap, (-child._best, order, key + label, child))
+        return res
+
+    def snapshot(self):
+        """Take a snapshot of the trie in constant time. The snapshot
+        and the trie share all their nodes, and each of them copies
+        only the nodes on the paths it modifies later.
+
+        @return: a new trie with the same content
+        """
+        # neither of us owns the shared nodes from now on
+        self._owner = object()
+        res = Trie()
+        res._owner = object()
+        res._trie_root = self._trie_root
+        return res
 
     def longest_prefix(self, seq, offset=0):
         """Find the longest prefix of seq starting at offset that is
@@ -50,31 +125,151 @@ class Trie(object):
         """
         return self._trie_root.longest_prefix(seq, offset)
 
+    def prefixes(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the trie, walking the trie only once.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over the index of the element
+        next to each prefix, shortest prefix first
+        """
+        return self._trie_root.prefixes(seq, offset)
+
+    def prefix_items(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the trie, together with their values.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over (index, value) tuples, the
+        index is of the element next to each prefix, shortest prefix
+        first
+        """
+        return self._trie_root.prefix_items(seq, offset)
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, whose reverse
+        is in the trie. This walks the trie backwards over seq, so the
+        trie should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffix
+
+        @return: the starting index of the longest suffix
+        """
+        return self._trie_root.longest_suffix(seq, end)
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, whose reverses
+        are in the trie, walking the trie only once.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffixes
+
+        @return: a generator iterates over the starting index of each
+        suffix, shortest suffix first
+        """
+        return self._trie_root.suffixes(seq, end)
+
     def __str__(self):
         return str(self._trie_root)
 
+    def __getstate__(self):
+        # a pickled trie shares nodes with nobody
+        state = self.__dict__.copy()
+        state["_owner"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # tries pickled before snapshots have no owner
+        self.__dict__.setdefault("_owner", None)
+
     def __repr__(self):
         return "<Trie: 0x%08x>" % id(self)
 
 
+# version of the pickled state of TrieNode. Older states are the
+# attribute dict of the baseline, (label, child, value), and (label,
+# child, value, best)
+_NODE_STATE = 2
+
 class TrieNode(object):
     """A node for a trie -- you should use class Trie to access data
     stored here.
     """
+    # no per-node __dict__, there are lots of nodes
+    __slots__ = ("_label", "_child", "_value", "_owner", "_best")
 
-    def __init__(self, label):
+    def __init__(self, label, owner=None):
         """Construct a trie node with label.
 
         @type label: hashable
         @param label: the label for this trie node
+        @type owner: anything you like
+        @param owner: the owner of this trie node
         """
         self._label = label
         self._child = {}
         self._value = None
+        self._owner = owner
+        # the highest value in this subtree
+        self._best = None
 
-    def insert(self, key, offset, value):
+    def copy(self, owner):
+        """Copy this node, sharing all the children.
+
+        @type owner: anything you like
+        @param owner: the owner of the new node
+        @return: the new node
+        """
+        res = TrieNode(self._label, owner)
+        res._child = self._child.copy()
+        res._value = self._value
+        res._best = self._best
+        return res
+
+    def _update_best(self, path, old):
+        """Update the highest values in the subtrees after the value of
+        the last node on path changed.
+
+        @type path: list of TrieNode
+        @param path: nodes from this node to the changed node
+        @param old: the old value of the changed node
+        """
+        value = path[-1]._value
+        if old is None or (value is not None and value >= old):
+            # nothing got lower
+            for node in path:
+                if node._best is None or node._best < value:
+                    node._best = value
+            return
+        for node in reversed(path):
+            best = node._value
+            for child in node._child.itervalues():
+                if child._best is not None and \
+                   (best is None or child._best > best):
+                    best = child._best
+            if best == node._best:
+                # so are those above
+                break
+            node._best = best
+
+    def insert(self, key, offset, value, owner=None):
         """Insert a node with key, if the node already exists, update
-        its value.
+        its value. Nodes on the way not owned by owner are copied
+        first.
 
         @type key: random accessible object of hashable elements
         @param key: the key for updating
@@ -82,16 +277,51 @@ class TrieNode(object):
         @param offset: starting part of actual key
         @type value: anything you like but None
         @param value: the value for the key
+        @type owner: anything you like
+        @param owner: the owner of this node
         """
         if value is None:
             raise ValueError
-        if offset == len(key):
-            self._value = value
-        else:
-            first = key[offset]
-            if first not in self._child:
-                self._child[first] = TrieNode(first)
-            self._child[first].insert(key, offset + 1, value)
+        node = self
+        path = [node]
+        for idx in xrange(offset, len(key)):
+            first = key[idx]
+            child = node._child.get(first)
+            if child is None:
+                child = node._child[first] = TrieNode(first, owner)
+            elif child._owner is not owner:
+                child = node._child[first] = child.copy(owner)
+            node = child
+            path.append(node)
+        old = node._value
+        node._value = value
+        self._update_best(path, old)
+
+    def remove(self, key, offset, owner=None):
+        """Remove the value of the node with key, the node itself is
+        kept. Nodes on the way not owned by owner are copied first.
+
+        @type key: random accessible object of hashable elements
+        @param key: the key for removing
+        @type offset: non-negative interge
+        @param offset: starting part of actual key
+        @type owner: anything you like
+        @param owner: the owner of this node
+        """
+        node = self
+        path = [node]
+        for idx in xrange(offset, len(key)):
+            first = key[idx]
+            child = node._child.get(first)
+            if child is None:
+                raise KeyError
+            if child._owner is not owner:
+                child = node._child[first] = child.copy(owner)
+            node = child
+            path.append(node)
+        old = node._value
+        node._value = None
+        self._update_best(path, old)
 
     def lookup(self, key, offset):
         """Lookup a node with key.
@@ -102,16 +332,14 @@ class TrieNode(object):
         @param offset: starting part of actual key
         @return: the value
         """
-        if offset == len(key):
-            if self._value is not None:
-                return self._value
-            else:
+        node = self
+        for idx in xrange(offset, len(key)):
+            node = node._child.get(key[idx])
+            if node is None:
                 raise KeyError
-        else:
-            first = key[offset]
-            if first not in self._child:
-                raise KeyError
-            return self._child[first].lookup(key, offset + 1)
+        if node._value is None:
+            raise KeyError
+        return node._value
 
     def longest_prefix(self, seq, offset):
         """Find the longest prefix of seq starting at this node.
@@ -122,21 +350,98 @@ class TrieNode(object):
         @param offset: starting part of actual key
         @return: the index if found, otherwise None
         """
-        if offset == len(seq):
-            if self._value is not None:
-                return offset
-            else:
-                return None
-        else:
-            first = seq[offset]
-            if first not in self._child:
-                if self._value is not None:
-                    return offset
-                else:
-                    return None
-            else:
-                return self._child[first].longest_prefix(seq, offset + 1) or \
-                       (offset if self._value is not None else None)
+        node = self
+        found = offset if node._value is not None else None
+        for idx in xrange(offset, len(seq)):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                found = idx + 1
+        return found
+
+    def prefixes(self, seq, offset):
+        """Find all the prefixes of seq starting at this node.
+
+        @seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative interge
+        @param offset: starting part of actual key
+        @return: a generator iterates over the index of the element
+        next to each prefix, in increasing order
+        """
+        node = self
+        if node._value is not None:
+            yield offset
+        for idx in xrange(offset, len(seq)):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                yield idx + 1
+
+    def prefix_items(self, seq, offset):
+        """Find all the prefixes of seq starting at this node, together
+        with their values.
+
+        @seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative interge
+        @param offset: starting part of actual key
+        @return: a generator iterates over (index, value) tuples, the
+        index is of the element next to each prefix, in increasing
+        order
+        """
+        node = self
+        if node._value is not None:
+            yield offset, node._value
+        for idx in xrange(offset, len(seq)):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                yield idx + 1, node._value
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, walking down
+        from this node backwards over seq.
+
+        @seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative interge
+        @param end: index of the element next to the suffix
+        @return: the starting index if found, otherwise None
+        """
+        node = self
+        found = end if node._value is not None else None
+        for idx in xrange(end - 1, -1, -1):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, walking down from
+        this node backwards over seq.
+
+        @seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative interge
+        @param end: index of the element next to the suffixes
+        @return: a generator iterates over the starting index of each
+        suffix, in decreasing order
+        """
+        node = self
+        if node._value is not None:
+            yield end
+        for idx in xrange(end - 1, -1, -1):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                yield idx
 
     def __str__(self):
         if self._child:
@@ -147,10 +452,513 @@ class TrieNode(object):
         else:
             return "(" + self._label + ")"
 
+    def __getstate__(self):
+        return (_NODE_STATE, self._label, self._child, self._value,
+                self._best)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled before TrieNode had __slots__
+            self._label = state["_label"]
+            self._child = state["_child"]
+            self._value = state["_value"]
+            best = False
+        elif len(state) == 3:
+            # pickled before nodes knew the highest values under them
+            self._label, self._child, self._value = state
+            best = False
+        elif len(state) == 4:
+            self._label, self._child, self._value, best = state
+        else:
+            version, self._label, self._child, self._value, best = state
+        if best is False:
+            # children are loaded before their parents, so the highest
+            # values are rebuilt bottom-up
+            best = self._value
+            for child in self._child.itervalues():
+                if child._best is not None and \
+                   (best is None or child._best > best):
+                    best = child._best
+        self._best = best
+        self._owner = None
+
     def __repr__(self):
         return "<Trie: 0x%08x>" % id(self)
 
 
+class CompactTrie(object):
+    """A trie with path compression, also known as a radix tree. A
+    chain of nodes with a single child each is stored as one node
+    labelled with the whole chain, and leaves have no child table at
+    all. It takes much less memory than Trie for a large dictionary.
+
+    It supports the lookups of Trie, i.e. [], longest_prefix(),
+    prefixes(), prefix_items(), longest_suffix() and suffixes(), and
+    keys can be added, but not deleted: there is no del, snapshot()
+    or complete().
+
+    In set mode, the trie only remembers which keys are in it, every
+    key has the value True. This is all a segmentor needs.
+
+    Sequences to look up should be of the same type as the keys,
+    since parts of them are compared by slicing.
+    """
+
+    def __init__(self, keys=None, value=lambda x:0, setmode=False):
+        """Construct a compact trie from keys.
+
+        @type keys: random accessible object with hashable elements
+        @param keys: keys from which the trie is constructed
+        @type value: callable
+        @param value: method to get values from keys, default sets
+        everything to 0, ignored in set mode
+        @type setmode: bool
+        @param setmode: whether the trie is in set mode
+        """
+        self._trie_root = RadixNode(None, None)
+        self._setmode = setmode
+        if keys:
+            for i in keys:
+                self[i] = value(i)
+
+    def __getitem__(self, key):
+        node = self._trie_root
+        idx = 0
+        size = len(key)
+        while idx < size:
+            if node._child is None:
+                raise KeyError
+            node = node._child.get(key[idx])
+            if node is None:
+                raise KeyError
+            label = node._label
+            if key[idx:idx + len(label)] != label:
+                raise KeyError
+            idx += len(label)
+        if node._value is None:
+            raise KeyError
+        return node._value
+
+    def __setitem__(self, key, value):
+        if value is None:
+            raise ValueError
+        if self._setmode:
+            value = True
+        node = self._trie_root
+        idx = 0
+        size = len(key)
+        while idx < size:
+            first = key[idx]
+            if node._child is None:
+                node._child = {}
+            child = node._child.get(first)
+            if child is None:
+                node._child[first] = RadixNode(key[idx:], value)
+                return
+            label = child._label
+            common = 1
+            while common < len(label) and idx + common < size and \
+                  label[common] == key[idx + common]:
+                common += 1
+            if common < len(label):
+                # split the child where the key leaves its label
+                middle = RadixNode(label[:common], None)
+                child._label = label[common:]
+                middle._child = {label[common]: child}
+                node._child[first] = middle
+                child = middle
+            node = child
+            idx += common
+        node._value = value
+
+    def add(self, key):
+        """Add a key with value True, the natural way in set mode.
+
+        @type key: random accessible object of hashable elements
+        @param key: the key to be added
+        """
+        self[key] = True
+
+    def longest_prefix(self, seq, offset=0):
+        """Find the longest prefix of seq starting at offset that is
+        in the trie.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest prefix will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: the index of the element next to the longest prefix
+        """
+        node = self._trie_root
+        found = offset if node._value is not None else None
+        idx = offset
+        size = len(seq)
+        while idx < size and node._child is not None:
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            label = node._label
+            if len(label) > 1 and seq[idx:idx + len(label)] != label:
+                break
+            idx += len(label)
+            if node._value is not None:
+                found = idx
+        return found
+
+    def prefixes(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the trie, walking the trie only once.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over the index of the element
+        next to each prefix, shortest prefix first
+        """
+        node = self._trie_root
+        if node._value is not None:
+            yield offset
+        idx = offset
+        size = len(seq)
+        while idx < size and node._child is not None:
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            label = node._label
+            if len(label) > 1 and seq[idx:idx + len(label)] != label:
+                break
+            idx += len(label)
+            if node._value is not None:
+                yield idx
+
+    def prefix_items(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the trie, together with their values.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over (index, value) tuples, the
+        index is of the element next to each prefix, shortest prefix
+        first
+        """
+        node = self._trie_root
+        if node._value is not None:
+            yield (offset, node._value)
+        idx = offset
+        size = len(seq)
+        while idx < size and node._child is not None:
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            label = node._label
+            if len(label) > 1 and seq[idx:idx + len(label)] != label:
+                break
+            idx += len(label)
+            if node._value is not None:
+                yield (idx, node._value)
+
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, whose reverse
+        is in the trie. This walks the trie backwards over seq, so the
+        trie should contain reversed keys.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffix
+
+        @return: the starting index of the longest suffix
+        """
+        node = self._trie_root
+        found = end if node._value is not None else None
+        idx = end
+        while idx > 0 and node._child is not None:
+            node = node._child.get(seq[idx - 1])
+            if node is None:
+                break
+            label = node._label
+            size = len(label)
+            if size > 1 and (idx < size or
+                             seq[idx - size:idx] != label[::-1]):
+                break
+            idx -= size
+            if node._value is not None:
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, whose reverses
+        are in the trie, walking the trie only once.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffixes
+
+        @return: a generator iterates over the starting index of each
+        suffix, shortest suffix first
+        """
+        node = self._trie_root
+        if node._value is not None:
+            yield end
+        idx = end
+        while idx > 0 and node._child is not None:
+            node = node._child.get(seq[idx - 1])
+            if node is None:
+                break
+            label = node._label
+            size = len(label)
+            if size > 1 and (idx < size or
+                             seq[idx - size:idx] != label[::-1]):
+                break
+            idx -= size
+            if node._value is not None:
+                yield idx
+
+    def __str__(self):
+        return str(self._trie_root)
+
+    def __repr__(self):
+        return "<CompactTrie: 0x%08x>" % id(self)
+
+
+class _Removed(object):
+    """Value of the keys deleted from an overlay.
+    """
+
+    def __reduce__(self):
+        # stay a singleton when pickled
+        return "_REMOVED"
+
+    def __repr__(self):
+        return "<removed>"
+
+_REMOVED = _Removed()
+
+
+class OverlayTrie(object):
+    """A small modifiable layer of keys on top of a large base trie,
+    which is never modified. Keys set on the overlay hide those in the
+    base, and keys deleted from the overlay are hidden even if they are
+    in the base.
+
+    The base can be anything providing the look-up interface of Trie,
+    like a FrozenTrie or a MappedTrie. The layer is a Trie, so that
+    taking a snapshot of the overlay costs constant time, and
+    modifying the snapshot costs time proportional to the keys
+    modified only.
+    """
+
+    def __init__(self, base):
+        """Construct an overlay with an empty layer on top of base.
+
+        @type base: a trie
+        @param base: the base trie, which will never be modified
+        """
+        self._base = base
+        self._layer = Trie()
+
+    def base(self):
+        """Get the base trie.
+
+        @return: the base trie
+        """
+        return self._base
+
+    def __getitem__(self, key):
+        try:
+            value = self._layer[key]
+        except KeyError:
+            return self._base[key]
+        if value is _REMOVED:
+            raise KeyError
+        return value
+
+    def __setitem__(self, key, value):
+        if value is None:
+            raise ValueError
+        self._layer[key] = value
+
+    def __delitem__(self, key):
+        self[key]
+        self._layer[key] = _REMOVED
+
+    def snapshot(self):
+        """Take a snapshot of the overlay in constant time.
+
+        @return: a new overlay on the same base with the same layer
+        """
+        res = OverlayTrie(self._base)
+        res._layer = self._layer.snapshot()
+        return res
+
+    def _layer_prefixes(self, seq, offset):
+        """Find all the prefixes of seq starting at offset in the layer.
+
+        @return: a dict mapping the index of the element next to each
+        prefix to whether the prefix is present or deleted
+        """
+        res = {}
+        node = self._layer._trie_root
+        if node._value is not None:
+            res[offset] = node._value is not _REMOVED
+        for idx in xrange(offset, len(seq)):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                res[idx + 1] = node._value is not _REMOVED
+        return res
+
+    def _layer_suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end in the layer.
+
+        @return: a dict mapping the starting index of each suffix to
+        whether the suffix is present or deleted
+        """
+        res = {}
+        node = self._layer._trie_root
+        if node._value is not None:
+            res[end] = node._value is not _REMOVED
+        for idx in xrange(end - 1, -1, -1):
+            node = node._child.get(seq[idx])
+            if node is None:
+                break
+            if node._value is not None:
+                res[idx] = node._value is not _REMOVED
+        return res
+
+    def longest_prefix(self, seq, offset=0):
+        """Find the longest prefix of seq starting at offset that is
+        in the overlay.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest prefix will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: the index of the element next to the longest prefix
+        """
+        layer = self._layer_prefixes(seq, offset)
+        if not layer:
+            return self._base.longest_prefix(seq, offset)
+        found = None
+        for idx in self._base.prefixes(seq, offset):
+            if layer.get(idx, True):
+                found = idx
+        for idx, present in layer.iteritems():
+            if present and (found is None or idx > found):
+                found = idx
+        return found
+
+    def prefixes(self, seq, offset=0):
+        """Find all the prefixes of seq starting at offset that are in
+        the overlay.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the prefixes will be extracted
+        @type offset: non-negative integer
+        @param offset: starting index
+
+        @return: a generator iterates over the index of the element
+        next to each prefix, shortest prefix first
+        """
+        layer = self._layer_prefixes(seq, offset)
+        found = set(idx for idx in self._base.prefixes(seq, offset)
+                    if layer.get(idx, True))
+        found.update(idx for idx, present in layer.iteritems() if present)
+        return iter(sorted(found))
+
+    def longest_suffix(self, seq, end):
+        """Find the longest suffix of seq ending at end, whose reverse
+        is in the overlay.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the longest suffix will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffix
+
+        @return: the starting index of the longest suffix
+        """
+        layer = self._layer_suffixes(seq, end)
+        if not layer:
+            return self._base.longest_suffix(seq, end)
+        found = None
+        for idx in self._base.suffixes(seq, end):
+            if layer.get(idx, True):
+                found = idx
+        for idx, present in layer.iteritems():
+            if present and (found is None or idx < found):
+                found = idx
+        return found
+
+    def suffixes(self, seq, end):
+        """Find all the suffixes of seq ending at end, whose reverses
+        are in the overlay.
+
+        @type seq: random accessible object with hashable elements
+        @param seq: from where the suffixes will be extracted
+        @type end: non-negative integer
+        @param end: index of the element next to the suffixes
+
+        @return: a generator iterates over the starting index of each
+        suffix, shortest suffix first
+        """
+        layer = self._layer_suffixes(seq, end)
+        found = set(idx for idx in self._base.suffixes(seq, end)
+                    if layer.get(idx, True))
+        found.update(idx for idx, present in layer.iteritems() if present)
+        return iter(sorted(found, reverse=True))
+
+    def __repr__(self):
+        return "<OverlayTrie: 0x%08x>" % id(self)
+
+
+class RadixNode(object):
+    """A node for a compact trie -- you should use class CompactTrie to
+    access data stored here.
+    """
+    __slots__ = ("_label", "_child", "_value")
+
+    def __init__(self, label, value):
+        """Construct a radix node with label.
+
+        @type label: random accessible object with hashable elements
+        @param label: the elements on the path to this node
+        @type value: anything you like
+        @param value: the value for the node, None for no value
+        """
+        self._label = label
+        self._child = None
+        self._value = value
+
+    def __getstate__(self):
+        return (self._label, self._child, self._value)
+
+    def __setstate__(self, state):
+        self._label, self._child, self._value = state
+
+    def __str__(self):
+        label = "" if self._label is None else self._label
+        if self._child:
+            return "(" + label + " " + \
+                   " ".join([str(self._child[i])
+                             for i in sorted(self._child)]) + \
+                   ")"
+        else:
+            return "(" + label + ")"
+
+    def __repr__(self):
+        return "<RadixNode: 0x%08x>" % id(self)
+
+
 def demo():
     """Demo for trie
     """
@@ -175,5 +983,16 @@ def demo():
         offset = idx
         idx = trie.longest_prefix(sent, offset)
 
+    print "All prefixes of", sent[6:], "in the trie:",
+    print [sent[6:i] for i in trie.prefixes(sent, 6)]
+
+    print "Top 2 completions of AB:", trie.complete("AB", 2)
+
+    print "Compact trie"
+    ctrie = CompactTrie(words, setmode=True)
+    print ctrie
+    print "All prefixes of", sent[6:], "in the trie:",
+    print [sent[6:i] for i in ctrie.prefixes(sent, 6)]
+
 if __name__ == "__main__":
     demo()
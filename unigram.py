@@ -11,14 +11,31 @@
 
 """Unigram segmentor using tagging technique
 """
-__all__ = ["UnigramTagger"]
+__all__ = ["UnigramTagger", "FrozenUnigramTagger", "train_parallel",
+           "load_tagger"]
 
-from collections import defaultdict
+import os
+import sys
+import cPickle
+import tempfile
+from array import array
+from multiprocessing import Pool, cpu_count
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from tagset import *
+from entity import POINT_CODING, POINT_DTYPE
 
 class UnigramTagger(object):
     """An unigram tagger
+
+    The counts are kept in a matrix of characters by tags, stored row
+    by row in a flat array of 32-bit integers. Taggers trained on
+    different parts of a corpus can be merged, and taggers can be
+    pickled, if their tag set can.
     """
 
     def __init__(self, tagset, train=None):
@@ -30,26 +47,332 @@ class UnigramTagger(object):
         @param train: training set
         """
         self.tagset = tagset
-        self.count = defaultdict(lambda : defaultdict(int))
+        self._tags = sorted(tagset.itags | tagset.otags)
+        self._columns = dict((tag, i) for i, tag in enumerate(self._tags))
+        self._chars = []
+        self._rows = {}
+        self._counts = array("I")
+        self.generation = 0
         if train:
             self.add_words(train)
 
-    def add_words(self, train):
+    def _add_tag(self, tag):
+        """Add a column for a tag not in the tag set.
+        """
+        width = len(self._tags)
+        counts = array("I")
+        for row in xrange(len(self._chars)):
+            counts.extend(self._counts[row * width:(row + 1) * width])
+            counts.append(0)
+        self._columns[tag] = width
+        self._tags.append(tag)
+        self._counts = counts
+
+    def _add_char(self, char):
+        """Add a row for a new character.
+
+        @return: the row of the character
+        """
+        row = self._rows[char] = len(self._chars)
+        self._chars.append(char)
+        self._counts.extend(array("I", [0]) * len(self._tags))
+        return row
+
+    def add_words(self, train, weighted=False):
         """Add words into the trie.
 
-        @type train: iterable of words
+        @type train: iterable of words, or of (sentence, count) tuples
+        if weighted
         @param train: training set
+        @type weighted: bool
+        @param weighted: whether train is weighted sentences, e.g. from
+        BaseCorpusReader.weighted_sents(), each of them is tagged once
+        and counted count times
         """
+        if weighted:
+            for sent, count in train:
+                self._add(sent, count)
+        else:
+            self._add(train, 1)
+        self.generation += 1
+
+    def _add(self, train, weight):
+        rows = self._rows
+        columns = self._columns
+        counts = self._counts
+        width = len(self._tags)
+        zeros = array("I", [0]) * width
         for char, tag in self.tagset.tag(train):
-            self.count[char][tag] += 1
+            row = rows.get(char)
+            if row is None:
+                row = rows[char] = len(self._chars)
+                self._chars.append(char)
+                counts.extend(zeros)
+            col = columns.get(tag)
+            if col is None:
+                self._add_tag(tag)
+                counts = self._counts
+                width = len(self._tags)
+                zeros = array("I", [0]) * width
+                col = columns[tag]
+            counts[row * width + col] += weight
+
+    def merge(self, other):
+        """Add the counts of another tagger, trained with the same tag
+        set, into this one.
+
+        @type other: UnigramTagger
+        @param other: the tagger to be merged
+        """
+        for tag in other._tags:
+            if tag not in self._columns:
+                self._add_tag(tag)
+        columns = [self._columns[tag] for tag in other._tags]
+        counts = self._counts
+        width = len(self._tags)
+        other_counts = other._counts
+        other_width = len(other._tags)
+        for char, other_row in other._rows.iteritems():
+            row = self._rows.get(char)
+            if row is None:
+                row = self._add_char(char)
+            base = row * width
+            other_base = other_row * other_width
+            for i, col in enumerate(columns):
+                counts[base + col] += other_counts[other_base + i]
+        self.generation += 1
+
+    def best_tags(self):
+        """Find the most frequent tag of every character. Ties go to
+        the first tag in sorted order.
+
+        @return: a generator iterates over (char, tag) tuples
+        """
+        tags = self._tags
+        counts = self._counts
+        width = len(tags)
+        for row, char in enumerate(self._chars):
+            line = counts[row * width:(row + 1) * width]
+            yield (char, tags[line.index(max(line))])
+
+    def counts(self):
+        """Get the counts as a dict of dicts, i.e. counts()[char][tag]
+        is how many times char is tagged as tag, tags never seen with
+        the character are left out.
+        """
+        tags = self._tags
+        counts = self._counts
+        width = len(tags)
+        res = {}
+        for row, char in enumerate(self._chars):
+            base = row * width
+            res[char] = dict((tag, counts[base + i])
+                             for i, tag in enumerate(tags)
+                             if counts[base + i])
+        return res
 
     def tag(self, sent):
         """Tag raw sent into (char, tag) tuple"""
+        rows = self._rows
+        tags = self._tags
+        counts = self._counts
+        width = len(tags)
         for char in sent:
-            if char in self.count:
-                yield (char, max(self.count[char].keys(), key=lambda x:self.count[char][x]))
-            else:
+            row = rows.get(char)
+            if row is None:
                 yield (char, None)
+            else:
+                line = counts[row * width:(row + 1) * width]
+                yield (char, tags[line.index(max(line))])
+
+    def __getstate__(self):
+        return {"tagset": self.tagset,
+                "tags": self._tags,
+                "chars": self._chars,
+                "counts": self._counts.tostring(),
+                "byteorder": sys.byteorder}
+
+    def __setstate__(self, state):
+        self.tagset = state["tagset"]
+        self._tags = state["tags"]
+        self._columns = dict((tag, i) for i, tag in enumerate(self._tags))
+        self._chars = state["chars"]
+        self._rows = dict((char, i) for i, char in enumerate(self._chars))
+        self._counts = array("I")
+        self._counts.fromstring(state["counts"])
+        if state["byteorder"] != sys.byteorder:
+            self._counts.byteswap()
+        self.generation = 0
+
+    def save(self, path):
+        """Save the tagger into a file, which can be loaded later by
+        load_tagger(). The tag set is saved too, so it must be
+        picklable, like the ones in tagset.template.
+
+        @type path: string
+        @param path: the path for the tagger file
+        """
+        out = open(path, "wb")
+        try:
+            cPickle.dump(self, out, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            out.close()
+
+    def __repr__(self):
+        return "<UnigramTagger: %d characters, %d tags>" % \
+               (len(self._chars), len(self._tags))
+
+
+def load_tagger(path):
+    """Load a tagger saved by UnigramTagger.save().
+
+    @type path: string
+    @param path: the path for the tagger file
+    @return: an UnigramTagger
+    """
+    in_file = open(path, "rb")
+    try:
+        return cPickle.load(in_file)
+    finally:
+        in_file.close()
+
+# the tag set of a worker process, set once when the worker starts
+_tagset = None
+
+def _init_worker(tagset):
+    global _tagset
+    _tagset = tagset
+
+def _words(shard):
+    if hasattr(shard, "words"):
+        return shard.words()
+    return shard
+
+def _train(shard):
+    return UnigramTagger(_tagset, _words(shard))
+
+def train_parallel(tagset, shards, workers=None):
+    """Train an unigram tagger in worker processes. Each shard is
+    counted by a worker, and the counts are merged as they come back.
+
+    Shards are pickled to the workers, so corpus readers, which only
+    keep the path of their file, are cheap to send, while lists of
+    words are sent as they are.
+
+    @type tagset: TagSet
+    @param tagset: the tag set to train
+    @type shards: iterable of corpus readers or lists of words
+    @param shards: parts of the training set, the words() of corpus
+    readers are used
+    @type workers: positive integer
+    @param workers: number of worker processes, default to the number
+    of CPUs, if it is 1, shards are counted in this process
+
+    @return: an UnigramTagger
+    """
+    if workers is None:
+        workers = cpu_count()
+    res = UnigramTagger(tagset)
+    if workers == 1:
+        for shard in shards:
+            res.add_words(_words(shard))
+        return res
+    pool = Pool(workers, _init_worker, (tagset,))
+    try:
+        for tagger in pool.imap_unordered(_train, shards):
+            res.merge(tagger)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return res
+
+
+class FrozenUnigramTagger(object):
+    """An unigram tagger which can not be trained anymore, but tags
+    much faster. The best tag of every character is looked up once
+    when it's frozen, and stored in a table indexed by code points.
+
+    If NumPy is available, tag_many() and tag_codes() look up all the
+    characters of the sentences in a single vectorized pass.
+    """
+
+    def __init__(self, tagger):
+        """Freeze an unigram tagger.
+
+        @type tagger: UnigramTagger
+        @param tagger: the trained tagger
+        """
+        self.tagset = tagger.tagset
+        # tag code 0 is for unknown characters
+        self.tags = [None]
+        codes = {}
+        best = {}
+        for char, tag in tagger.best_tags():
+            if tag not in codes:
+                codes[tag] = len(self.tags)
+                self.tags.append(tag)
+            best[ord(char)] = codes[tag]
+        size = max(best) + 1 if best else 0
+        self._table = array("B" if len(self.tags) < 256 else "H",
+                            [0]) * size
+        for point, code in best.iteritems():
+            self._table[point] = code
+        if numpy is not None:
+            self._ntable = numpy.array(self._table, dtype=numpy.uint16)
+            self._ntags = numpy.array(self.tags, dtype=object)
+
+    def tag(self, sent):
+        """Tag raw sent into (char, tag) tuple"""
+        table = self._table
+        tags = self.tags
+        size = len(table)
+        for char in sent:
+            point = ord(char)
+            yield (char, tags[table[point]] if point < size else None)
+
+    def tag_codes(self, sent):
+        """Tag raw sent into tag codes, i.e. indices into self.tags.
+
+        @type sent: unicode string
+        @param sent: the sentence to be tagged
+        @return: an array of the tag codes, a NumPy array if NumPy is
+        available
+        """
+        if numpy is None:
+            table = self._table
+            size = len(table)
+            return array("H", [table[i] if i < size else 0
+                               for i in map(ord, sent)])
+        points = numpy.frombuffer(sent.encode(POINT_CODING),
+                               dtype=POINT_DTYPE)
+        size = len(self._ntable)
+        if not size:
+            return numpy.zeros(len(points), dtype=numpy.uint16)
+        # out of the table means unknown, which is code 0
+        res = self._ntable[numpy.minimum(points, size - 1)]
+        res[points >= size] = 0
+        return res
+
+    def tag_many(self, sents):
+        """Tag many raw sentences at a time.
+
+        @type sents: list of unicode strings
+        @param sents: the sentences to be tagged
+        @return: a list of lists of (char, tag) tuples
+        """
+        codes = self.tag_codes(u"".join(sents))
+        if numpy is None:
+            tags = [self.tags[i] for i in codes]
+        else:
+            tags = self._ntags[codes].tolist()
+        res = []
+        start = 0
+        for sent in sents:
+            end = start + len(sent)
+            res.append(zip(sent, tags[start:end]))
+            start = end
+        return res
 
 
 def demo():
@@ -72,6 +395,24 @@ def demo():
 
     print segger.seg(s)
 
+    print "Trained in parallel"
+    tagset = BMESTagSet()
+    words = [u"结合", u"成", u"分子", u"时", u"合成", u"分子", u"结合"] * 100
+    tagger = train_parallel(tagset, [words[:300], words[300:]], workers=2)
+    print tagger, tagger.counts()[u"合"]
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        tagger.save(path)
+        tagger = load_tagger(path)
+    finally:
+        os.remove(path)
+    print TagSeg(tagset, tagger.tag).seg(u"结合成分子时")
+
+    frozen = FrozenUnigramTagger(tagger)
+    print frozen.tag_many([u"结合成分子时", u"分子"])
+    print TagSeg(tagset, frozen.tag).seg(u"结合成分子时")
+
 
 if __name__ == "__main__":
     demo()